@@ -0,0 +1,58 @@
+from django.db import connection, transaction
+
+from bankingsystem.block_allocator import BlockAllocator
+
+from .models import AccountNumberBlock
+
+
+# Postgres sequence created by migration 0002; other databases use AccountNumberBlock.
+ACCOUNT_NO_SEQUENCE = "accounts_account_no_seq"
+FIRST_ACCOUNT_NO = 10000000
+
+
+def _reserve_from_sequence(count):
+    # nextval() is never rolled back and never hands out a value twice
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [ACCOUNT_NO_SEQUENCE, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _reserve_block(size):
+    """Reserve ``size`` consecutive numbers from the block table; returns the first."""
+    with transaction.atomic():
+        block = AccountNumberBlock.objects.select_for_update().first()
+        if block is None:
+            block = AccountNumberBlock.objects.create(next_value=FIRST_ACCOUNT_NO)
+        start = block.next_value
+        block.next_value = start + size
+        block.save(update_fields=["next_value"])
+    return start
+
+
+class AccountNumberAllocator(BlockAllocator):
+    """Hands out unique account numbers without scanning AccountDetails.
+
+    On Postgres every number comes from a native sequence. Elsewhere each
+    process reserves ``ACCOUNT_NO_BLOCK_SIZE`` numbers at a time from the
+    AccountNumberBlock row.
+    """
+
+    block_size_setting = "ACCOUNT_NO_BLOCK_SIZE"
+    default_block_size = 100
+
+    def next(self):
+        return self.take(1)[0]
+
+    def take(self, count):
+        if connection.vendor == "postgresql":
+            return _reserve_from_sequence(count)
+        return super().take(count)
+
+    def reserve(self, size):
+        return _reserve_block(size)
+
+
+allocator = AccountNumberAllocator()
@@ -1,21 +1,8 @@
-import csv
-from datetime import date
-from django.http import HttpResponse
-
-
-def export_as_csv(modeladmin, request, queryset):
-    response = HttpResponse(content_type='text/csv')
-    filename = f"data_export_{date.today()}.csv"  # Include the current date in the filename
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    writer = csv.writer(response)
-    model = queryset.model
-    fields = [field.name for field in model._meta.fields]
-
-    writer.writerow(fields)
-    for obj in queryset:
-        writer.writerow([getattr(obj, field) for field in fields])
-
-    return response
-
-export_as_csv.short_description = "Export selected objects as CSV"
+# The export helpers are shared by every app; they live in bankingsystem.admin_actions.
+from bankingsystem.admin_actions import (  # noqa: F401
+    CSVExportMixin,
+    csv_export_response,
+    export_as_csv,
+    export_as_csv_gz,
+    stream_csv,
+)
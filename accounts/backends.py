@@ -1,44 +1,52 @@
-from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth import get_user_model
-
 from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth.hashers import check_password
-from .models import User
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 
-from django.contrib.auth.hashers import check_password
+from .login_throttle import is_throttled, record_failure, reset_failures
 
-class CustomAuthBackend(ModelBackend):
-    def get_user(self, user_id):
-        User = get_user_model()
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
 
-    def authenticate(self, request, username=None, password=None, **kwargs):
-        User = get_user_model()
-        try:
-            user = User.objects.get(username=username)
-            if check_password(password, user.password):
-                return user
-        except User.DoesNotExist:
-            return None
+class AccountBackend(ModelBackend):
+    """The only authentication backend: email or username, one query, one hash check.
 
-class AccountNoBackend(BaseBackend):
+    The user is fetched by ``email = x OR username = x`` (both unique, so
+    both indexed) and the password hash is checked once. Once the account
+    or the client IP has too many recent failures the attempt is refused
+    before any query or hashing, and ``authenticate()`` stops there.
 
-    def authenticate(self, request, username=None, password=None, **kwargs):
-        UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(username=username)
-        except UserModel.DoesNotExist:
-            return None
-        if user.check_password(password):
-            return user
+    ``get_user()`` (run on every authenticated request) joins the account
+    and address, so reading them off ``request.user`` needs no more queries.
+    """
 
     def get_user(self, user_id):
         UserModel = get_user_model()
-        try:
-            return UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return None
+        user = UserModel._default_manager.select_related("account", "address").filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
 
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        if is_throttled(request, username):
+            # PermissionDenied makes django.contrib.auth.authenticate() give up
+            raise PermissionDenied
+
+        # an address matching one user's email wins over another's username
+        matches = sorted(
+            UserModel.objects.filter(Q(email=username) | Q(username=username))[:2],
+            key=lambda candidate: candidate.email != username,
+        )
+        user = matches[0] if matches else None
+        if user is None:
+            # hash anyway, so response time does not reveal which accounts exist
+            UserModel().set_password(password)
+        elif user.check_password(password) and self.user_can_authenticate(user):
+            reset_failures(username)
+            return user
+        elif request is not None:
+            # lets the login view record the failure against the account without another query
+            request.login_failed_user = user
+        record_failure(request, username)
+        return None
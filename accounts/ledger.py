@@ -0,0 +1,111 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import AccountDetails, BalanceSnapshot, LedgerEntry
+
+
+ASSETS = ("balance", "bitcoins", "ethereums")
+
+# Accounts handled per query while snapshotting.
+SNAPSHOT_CHUNK_SIZE = 500
+
+
+def post_entry(account, asset, amount, memo=""):
+    """Append a ledger entry and move the matching balance column by ``amount``.
+
+    The column moves with an ``F()`` update in the same transaction as the
+    entry, so concurrent postings add up instead of overwriting each other
+    and only that one column is written.
+    """
+    if asset not in ASSETS:
+        raise ValueError(f"Unknown asset {asset!r}; expected one of {', '.join(ASSETS)}.")
+    amount = Decimal(amount)
+    with transaction.atomic():
+        entry = LedgerEntry.objects.create(account=account, asset=asset, amount=amount, memo=memo)
+        AccountDetails.objects.filter(pk=account.pk).update(**{asset: F(asset) + amount})
+    account.refresh_from_db(fields=[asset])
+    return entry
+
+
+def set_balance(account, asset, value, memo="Balance set"):
+    """Post whatever entry brings ``asset`` to ``value``; returns it, or None if already there."""
+    with transaction.atomic():
+        # the row lock keeps two concurrent "set to X" calls from both posting a delta
+        current = (
+            AccountDetails.objects.select_for_update()
+            .filter(pk=account.pk)
+            .values_list(asset, flat=True)
+            .get()
+        )
+        delta = Decimal(value) - current
+        if not delta:
+            return None
+        return post_entry(account, asset, delta, memo=memo)
+
+
+def balance_as_of(account, when):
+    """Balances of ``account`` at ``when``: the latest snapshot plus the entries after it."""
+    snapshot = (
+        BalanceSnapshot.objects.filter(account=account, taken_at__lte=when)
+        .order_by("-taken_at")
+        .first()
+    )
+    totals = {asset: getattr(snapshot, asset) if snapshot else Decimal("0.00") for asset in ASSETS}
+    entries = LedgerEntry.objects.filter(account=account, created_at__lte=when)
+    if snapshot:
+        entries = entries.filter(created_at__gt=snapshot.taken_at)
+    for asset, total in entries.order_by().values("asset").annotate(total=Sum("amount")).values_list("asset", "total"):
+        totals[asset] += total
+    return totals
+
+
+@transaction.atomic
+def take_snapshots(lag=timedelta(minutes=1)):
+    """Snapshot every account with entries since the previous run; returns rows written.
+
+    Each run covers the entries between the previous run and ``now - lag``;
+    the lag lets transactions that stamped their entries just before then
+    commit first.
+    """
+    taken_at = timezone.now() - lag
+    previous = (
+        BalanceSnapshot.objects.filter(taken_at__lt=taken_at)
+        .order_by("-taken_at")
+        .values_list("taken_at", flat=True)
+        .first()
+    )
+    entries = LedgerEntry.objects.filter(created_at__lte=taken_at)
+    if previous:
+        entries = entries.filter(created_at__gt=previous)
+    changes = defaultdict(dict)
+    for account_id, asset, total in (
+        entries.order_by().values("account_id", "asset").annotate(total=Sum("amount"))
+        .values_list("account_id", "asset", "total")
+    ):
+        changes[account_id][asset] = total
+
+    account_ids = sorted(changes)
+    latest = BalanceSnapshot.objects.filter(account=OuterRef("account")).order_by("-taken_at").values("taken_at")[:1]
+    written = 0
+    for start in range(0, len(account_ids), SNAPSHOT_CHUNK_SIZE):
+        chunk = account_ids[start:start + SNAPSHOT_CHUNK_SIZE]
+        bases = {
+            snapshot.account_id: snapshot
+            for snapshot in BalanceSnapshot.objects.filter(account_id__in=chunk, taken_at=Subquery(latest))
+        }
+        snapshots = []
+        for account_id in chunk:
+            base = bases.get(account_id)
+            values = {
+                asset: (getattr(base, asset) if base else Decimal("0.00")) + changes[account_id].get(asset, 0)
+                for asset in ASSETS
+            }
+            snapshots.append(BalanceSnapshot(account_id=account_id, taken_at=taken_at, **values))
+        BalanceSnapshot.objects.bulk_create(snapshots)
+        written += len(snapshots)
+    return written
@@ -0,0 +1,64 @@
+import hashlib
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from bankingsystem.keyset import newest_first_page
+
+from .models import LoginDevice, LoginHistory, LoginSummary
+
+
+LOGIN_HISTORY_PAGE_SIZE = 20
+SUCCESS_STATUS = "Successful"
+
+
+def device_fingerprint(entry):
+    """Stable key for the device/OS/browser combination of a history row."""
+    parts = (entry.device_type, entry.device_name, entry.operating_system, entry.browser)
+    return hashlib.md5("|".join(part or "" for part in parts).encode("utf-8")).hexdigest()
+
+
+def latest_logins(user, before=None, limit=LOGIN_HISTORY_PAGE_SIZE):
+    """Return ``(rows, next_cursor)`` for one newest-first page of ``user``'s history.
+
+    Pages walk the (user, -timestamp, -id) index, so any page costs O(limit).
+    """
+    return newest_first_page(LoginHistory.objects.filter(user=user), before, limit)
+
+
+@transaction.atomic
+def write_login_history(entries):
+    """Insert history rows and fold them into the per-user summaries."""
+    LoginHistory.objects.bulk_create(entries)
+
+    totals = defaultdict(lambda: {"last_login_at": None, "failures": 0})
+    devices = set()
+    for entry in entries:
+        user_totals = totals[entry.user_id]
+        if entry.status == SUCCESS_STATUS:
+            last = user_totals["last_login_at"]
+            user_totals["last_login_at"] = entry.timestamp if last is None else max(last, entry.timestamp)
+        else:
+            user_totals["failures"] += 1
+        devices.add((entry.user_id, device_fingerprint(entry)))
+
+    LoginSummary.objects.bulk_create([LoginSummary(user_id=user_id) for user_id in totals], ignore_conflicts=True)
+    LoginDevice.objects.bulk_create(
+        [LoginDevice(user_id=user_id, fingerprint=fingerprint) for user_id, fingerprint in devices],
+        ignore_conflicts=True,
+    )
+    device_counts = (
+        LoginDevice.objects.filter(user=OuterRef("pk")).order_by()
+        .values("user").annotate(n=Count("pk")).values("n")
+    )
+    LoginSummary.objects.filter(pk__in=list(totals)).update(device_count=Coalesce(Subquery(device_counts), 0))
+    for user_id, user_totals in totals.items():
+        updates = {}
+        if user_totals["failures"]:
+            updates["failure_count"] = F("failure_count") + user_totals["failures"]
+        if user_totals["last_login_at"]:
+            last = Value(user_totals["last_login_at"])
+            updates["last_login_at"] = Greatest(Coalesce(F("last_login_at"), last), last)
+        LoginSummary.objects.filter(pk=user_id).update(**updates)
@@ -0,0 +1,140 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from user_agents import parse
+
+from .login_activity import write_login_history
+from .models import LoginHistory
+
+
+logger = logging.getLogger(__name__)
+
+# How often the idle writer thread checks whether it should stop.
+_POLL_SECONDS = 0.5
+
+
+@lru_cache(maxsize=1024)
+def parse_user_agent(user_agent):
+    """Return ``(device_type, device_name, operating_system, browser)`` for a UA string.
+
+    Parsing runs a long list of regexes, while real traffic repeats a small
+    set of UA strings, so results are cached per exact string.
+    """
+    parsed = parse(user_agent or "")
+    return parsed.device.family, parsed.device.model, parsed.os.family, parsed.browser.family
+
+
+def build_login_history(request, user, status):
+    """Unsaved LoginHistory row describing this request."""
+    device_type, device_name, operating_system, browser = parse_user_agent(
+        request.META.get("HTTP_USER_AGENT", "")
+    )
+    return LoginHistory(
+        user=user,
+        status=status,
+        timestamp=timezone.now(),
+        operating_system=operating_system,
+        browser=browser,
+        device_type=device_type,
+        device_name=device_name,
+        location=None,
+        ip_address=request.META.get("REMOTE_ADDR"),
+    )
+
+
+class LoginHistoryWriter:
+    """Bounded write-behind queue for LoginHistory rows.
+
+    ``record()`` only enqueues; a daemon thread writes whatever is queued
+    through ``write_login_history``, up to ``LOGIN_HISTORY_BATCH_SIZE`` rows at a time.
+    When the queue is full the row is written inline rather than dropped,
+    and whatever is still queued is flushed when the process exits.
+    ``LOGIN_HISTORY_WRITE_BEHIND = False`` writes every row inline instead.
+    """
+
+    def __init__(self, autostart=True):
+        self.autostart = autostart
+        self._queue = queue.Queue(maxsize=getattr(settings, "LOGIN_HISTORY_QUEUE_SIZE", 10000))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, entry):
+        if not getattr(settings, "LOGIN_HISTORY_WRITE_BEHIND", True):
+            write_login_history([entry])
+            return
+        if self.autostart:
+            self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # overloaded: keep the audit row at the cost of this request's latency
+            write_login_history([entry])
+
+    def flush(self):
+        """Write everything queued so far on the calling thread; returns rows written."""
+        written = 0
+        while True:
+            batch = self._drain(getattr(settings, "LOGIN_HISTORY_BATCH_SIZE", 200))
+            if not batch:
+                return written
+            self._write(batch)
+            written += len(batch)
+
+    def stop(self):
+        """Stop the background thread and flush what is left."""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # a forked worker inherits the object but not the parent's thread
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="login-history-writer", daemon=True)
+            self._thread.start()
+
+    def _drain(self, limit, timeout=None):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait())
+            while len(batch) < limit:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        try:
+            write_login_history(batch)
+        except Exception:
+            logger.exception("Could not write %d login history rows", len(batch))
+
+    def _run(self):
+        batch_size = getattr(settings, "LOGIN_HISTORY_BATCH_SIZE", 200)
+        try:
+            while not self._stop.is_set():
+                batch = self._drain(batch_size, timeout=_POLL_SECONDS)
+                if batch:
+                    close_old_connections()
+                    self._write(batch)
+        finally:
+            connection.close()
+
+
+writer = LoginHistoryWriter()
+atexit.register(writer.stop)
@@ -0,0 +1,62 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from bankingsystem.client_ip import get_client_ip
+
+
+LOGIN_THROTTLE_PREFIX = "login:failures:"
+
+
+def _limits():
+    return (
+        getattr(settings, "LOGIN_THROTTLE_ACCOUNT_LIMIT", 10),
+        getattr(settings, "LOGIN_THROTTLE_IP_LIMIT", 50),
+    )
+
+
+def _window():
+    return getattr(settings, "LOGIN_THROTTLE_WINDOW", 15 * 60)
+
+
+def _account_key(username):
+    # hashed, so any submitted username is a valid cache key
+    digest = hashlib.md5((username or "").strip().lower().encode("utf-8")).hexdigest()
+    return f"{LOGIN_THROTTLE_PREFIX}account:{digest}"
+
+
+def _ip_key(request):
+    ip_address = get_client_ip(request) if request is not None else None
+    return f"{LOGIN_THROTTLE_PREFIX}ip:{ip_address}" if ip_address else None
+
+
+def is_throttled(request, username):
+    """True once the account or the client IP has failed too often in the current window."""
+    account_limit, ip_limit = _limits()
+    ip_key = _ip_key(request)
+    keys = [_account_key(username)] + ([ip_key] if ip_key else [])
+    counts = cache.get_many(keys)
+    return (
+        counts.get(keys[0], 0) >= account_limit
+        or (ip_key is not None and counts.get(ip_key, 0) >= ip_limit)
+    )
+
+
+def record_failure(request, username):
+    """Count a failed attempt against the account and the client IP."""
+    for key in (_account_key(username), _ip_key(request)):
+        if key is None:
+            continue
+        # the window starts at the first failure and is not extended by later ones
+        if not cache.add(key, 1, timeout=_window()):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # expired between add() and incr(); this failure opens a new window
+                cache.set(key, 1, timeout=_window())
+
+
+def reset_failures(username):
+    """Forget the account's failures after a successful login (the IP count stays)."""
+    cache.delete(_account_key(username))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounts.ledger import take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Write balance snapshots for accounts with ledger entries since the last run. "
+        "Run it periodically (e.g. hourly from cron) to keep balance_as_of() reads short."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lag",
+            type=int,
+            default=60,
+            help="Seconds to stay behind now, so in-flight postings commit first.",
+        )
+
+    def handle(self, *args, **options):
+        written = take_snapshots(lag=timedelta(seconds=options["lag"]))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} balance snapshot(s)."))
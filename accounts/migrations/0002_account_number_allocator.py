@@ -0,0 +1,40 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:32
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def start_allocator(apps, schema_editor):
+    # one last aggregate: numbers continue above everything issued so far,
+    # including the random ones AccountDetails.save used to assign
+    AccountDetails = apps.get_model("accounts", "AccountDetails")
+    alias = schema_editor.connection.alias
+    largest = AccountDetails.objects.using(alias).aggregate(Max("account_no"))["account_no__max"]
+    start = largest + 1 if largest else 10000000
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"CREATE SEQUENCE accounts_account_no_seq START WITH {int(start)}")
+    else:
+        apps.get_model("accounts", "AccountNumberBlock").objects.using(alias).create(next_value=start)
+
+
+def stop_allocator(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP SEQUENCE IF EXISTS accounts_account_no_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountNumberBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(start_allocator, stop_allocator),
+    ]
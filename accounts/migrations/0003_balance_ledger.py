@@ -0,0 +1,69 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    # existing balances become opening entries, so replaying the ledger matches the columns
+    AccountDetails = apps.get_model("accounts", "AccountDetails")
+    LedgerEntry = apps.get_model("accounts", "LedgerEntry")
+    alias = schema_editor.connection.alias
+    now = timezone.now()
+    entries = []
+    for account in AccountDetails.objects.using(alias).only("balance", "bitcoins", "ethereums").iterator():
+        for asset in ("balance", "bitcoins", "ethereums"):
+            amount = getattr(account, asset)
+            if amount:
+                entries.append(LedgerEntry(
+                    account=account, asset=asset, amount=amount, memo="Opening balance", created_at=now,
+                ))
+    LedgerEntry.objects.using(alias).bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_account_number_allocator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(db_index=True)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('bitcoins', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('ethereums', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='accounts.accountdetails')),
+            ],
+            options={
+                'verbose_name': 'Balance Snapshot',
+                'verbose_name_plural': 'Balance Snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset', models.CharField(choices=[('balance', 'Balance'), ('bitcoins', 'Bitcoins'), ('ethereums', 'Ethereums')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('memo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='accounts.accountdetails')),
+            ],
+            options={
+                'verbose_name': 'Ledger Entry',
+                'verbose_name_plural': 'Ledger Entries',
+                'indexes': [models.Index(fields=['account', 'created_at'], name='accounts_ledger_acct_ts_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='balancesnapshot',
+            constraint=models.UniqueConstraint(fields=('account', 'taken_at'), name='accounts_snapshot_acct_ts_uniq'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import hashlib
+from django.db.models import Count, Max, Min, Q
+
+
+def summarise_history(apps, schema_editor):
+    # seed summaries and devices from the history written so far
+    LoginHistory = apps.get_model("accounts", "LoginHistory")
+    LoginSummary = apps.get_model("accounts", "LoginSummary")
+    LoginDevice = apps.get_model("accounts", "LoginDevice")
+    alias = schema_editor.connection.alias
+    history = LoginHistory.objects.using(alias).order_by()
+
+    devices = {}
+    for row in history.values(
+        "user_id", "device_type", "device_name", "operating_system", "browser",
+    ).annotate(first_seen=Min("timestamp")).iterator():
+        parts = (row["device_type"], row["device_name"], row["operating_system"], row["browser"])
+        fingerprint = hashlib.md5("|".join(part or "" for part in parts).encode("utf-8")).hexdigest()
+        key = (row["user_id"], fingerprint)
+        if key not in devices or row["first_seen"] < devices[key].first_seen:
+            devices[key] = LoginDevice(user_id=row["user_id"], fingerprint=fingerprint, first_seen=row["first_seen"])
+    LoginDevice.objects.using(alias).bulk_create(devices.values(), batch_size=500)
+
+    device_counts = {}
+    for user_id, _ in devices:
+        device_counts[user_id] = device_counts.get(user_id, 0) + 1
+    summaries = [
+        LoginSummary(
+            user_id=row["user_id"],
+            last_login_at=row["last_login_at"],
+            failure_count=row["failure_count"],
+            device_count=device_counts.get(row["user_id"], 0),
+        )
+        for row in history.values("user_id").annotate(
+            last_login_at=Max("timestamp", filter=Q(status="Successful")),
+            failure_count=Count("pk", filter=~Q(status="Successful")),
+        ).iterator()
+    ]
+    LoginSummary.objects.using(alias).bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_loginhistory_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoginSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='login_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_login_at', models.DateTimeField(blank=True, null=True)),
+                ('device_count', models.PositiveIntegerField(default=0)),
+                ('failure_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='accounts_login_user_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='logindevice',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_devices', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='logindevice',
+            constraint=models.UniqueConstraint(fields=('user', 'fingerprint'), name='accounts_login_device_uniq'),
+        ),
+        migrations.RunPython(summarise_history, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,4 @@
 
-import random
 import uuid
 
 from django.contrib.auth.models import AbstractUser
@@ -10,6 +9,7 @@ from django.core.validators import (
 )
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .managers import UserManager
@@ -97,22 +97,22 @@ class User(AbstractUser):
     @balance.setter
     def balance(self, value):
         if hasattr(self, 'account'):
-            self.account.balance = value
-            self.account.save()
+            from .ledger import set_balance
+            set_balance(self.account, "balance", value)
 
 
     @bitcoins.setter
     def bitcoins(self, value):
         if hasattr(self, 'account'):
-            self.account.bitcoins = value
-            self.account.save()
+            from .ledger import set_balance
+            set_balance(self.account, "bitcoins", value)
 
 
     @ethereums.setter
     def ethereums(self, value):
         if hasattr(self, 'account'):
-            self.account.ethereums = value
-            self.account.save()
+            from .ledger import set_balance
+            set_balance(self.account, "ethereums", value)
 
 
 
@@ -121,7 +121,8 @@ class User(AbstractUser):
     def status(self, value):
         if hasattr(self, 'account'):
             self.account.status = value
-            self.account.save()
+            # only the status column: a full save would write back stale balances
+            self.account.save(update_fields=["status"])
 
 
     class Meta:
@@ -180,14 +181,9 @@ class AccountDetails(models.Model):
 
             # Update the status to 'VERIFIED'
             self.status = 'VERIFIED'
-            self.save()   
+            self.save(update_fields=["status"])
         
 
-    def save(self, *args, **kwargs):
-        if not self.pk:
-            self.account_no = random.randint(10000000, 99999999)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return str(self.user.username)
 
@@ -197,6 +193,66 @@ class AccountDetails(models.Model):
 
 
 
+class LedgerEntry(models.Model):
+    """One append-only change to an account balance; AccountDetails holds the running totals."""
+
+    ASSET_CHOICES = (
+        ("balance", "Balance"),
+        ("bitcoins", "Bitcoins"),
+        ("ethereums", "Ethereums"),
+    )
+
+    account = models.ForeignKey(AccountDetails, related_name="ledger_entries", on_delete=models.CASCADE)
+    asset = models.CharField(choices=ASSET_CHOICES, max_length=10)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only; post a correcting entry instead.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.account_id} {self.asset} {self.amount:+} @ {self.created_at}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["account", "created_at"], name="accounts_ledger_acct_ts_idx"),
+        ]
+        verbose_name = "Ledger Entry"
+        verbose_name_plural = "Ledger Entries"
+
+
+class BalanceSnapshot(models.Model):
+    """Balances of one account as of ``taken_at``, so history reads start here instead of at zero."""
+
+    account = models.ForeignKey(AccountDetails, related_name="balance_snapshots", on_delete=models.CASCADE)
+    taken_at = models.DateTimeField(db_index=True)
+    balance = models.DecimalField(default=0, max_digits=12, decimal_places=2)
+    bitcoins = models.DecimalField(default=0, max_digits=12, decimal_places=2)
+    ethereums = models.DecimalField(default=0, max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.account_id} @ {self.taken_at}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["account", "taken_at"], name="accounts_snapshot_acct_ts_uniq"),
+        ]
+        verbose_name = "Balance Snapshot"
+        verbose_name_plural = "Balance Snapshots"
+
+
+class AccountNumberBlock(models.Model):
+    """Next unreserved account number, for databases without native sequences."""
+
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        return str(self.next_value)
+
+
 class UserAddress(models.Model):
     user = models.OneToOneField(
         User,
@@ -223,7 +279,8 @@ class Userpassword(models.Model):
 
 class LoginHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # set when the login happens; rows are inserted later by accounts.login_telemetry
+    timestamp = models.DateTimeField(default=timezone.now)
     status = models.CharField(max_length=20)
     operating_system = models.CharField(max_length=200, null=True, blank=True)
     browser = models.CharField(max_length=200, null=True, blank=True)
@@ -234,3 +291,34 @@ class LoginHistory(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.timestamp} - {self.status}"
+
+    class Meta:
+        indexes = [
+            # newest-first keyset pages of one user's history
+            models.Index(fields=["user", "-timestamp", "-id"], name="accounts_login_user_ts_idx"),
+        ]
+
+
+class LoginSummary(models.Model):
+    """Per-user login totals, kept current as history rows are written."""
+
+    user = models.OneToOneField(User, primary_key=True, related_name="login_summary", on_delete=models.CASCADE)
+    last_login_at = models.DateTimeField(null=True, blank=True)
+    device_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: last login {self.last_login_at}"
+
+
+class LoginDevice(models.Model):
+    """A distinct device/OS/browser combination a user has logged in from."""
+
+    user = models.ForeignKey(User, related_name="login_devices", on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=32)
+    first_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "fingerprint"], name="accounts_login_device_uniq"),
+        ]
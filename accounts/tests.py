@@ -1,3 +1,465 @@
-from django.test import TestCase
+import itertools
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, authenticate, get_user
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from bankingsystem.block_allocator import BlockAllocator
+
+from .account_numbers import allocator
+from .ledger import balance_as_of, post_entry, take_snapshots
+from .login_activity import latest_logins, write_login_history
+from .login_telemetry import LoginHistoryWriter, build_login_history, parse_user_agent
+from .models import AccountDetails, BalanceSnapshot, LedgerEntry, LoginHistory, LoginSummary, User, UserAddress
+from .signals import create_account_no
+
+
+class AccountNumberAllocatorTests(TestCase):
+    def test_new_accounts_get_increasing_unique_numbers(self):
+        numbers = []
+        for n in range(5):
+            user = User.objects.create(email=f"user{n}@example.com", username=f"user{n}")
+            numbers.append(AccountDetails.objects.create(user=user).account_no)
+        self.assertEqual(len(set(numbers)), 5)
+        self.assertEqual(numbers, sorted(numbers))
+
+    def test_allocation_does_not_aggregate_accounts(self):
+        user = User.objects.create(email="customer@example.com", username="customer")
+        with CaptureQueriesContext(connection) as queries:
+            account = AccountDetails.objects.create(user=user)
+        self.assertTrue(account.account_no)
+        self.assertFalse([query for query in queries.captured_queries if "MAX(" in query["sql"].upper()])
+
+    def test_staff_and_superusers_get_no_account_number(self):
+        staff = User.objects.create(email="staff@example.com", username="staff", is_staff=True)
+        admin = User.objects.create(email="root@example.com", username="root", is_superuser=True)
+        with mock.patch("accounts.signals.allocator") as allocator:
+            for user in (staff, admin):
+                account = AccountDetails(user=user)
+                create_account_no(AccountDetails, account)
+                self.assertIsNone(account.account_no)
+        allocator.next.assert_not_called()
+
+
+class BlockAllocatorConcurrencyTests(SimpleTestCase):
+    """The shared block logic under threads, against an in-memory reservation counter."""
+
+    def test_parallel_takes_get_unique_numbers(self):
+        reserved = itertools.count(1)
+        reserve_lock = threading.Lock()
+
+        def reserve(size):
+            with reserve_lock:
+                start = next(reserved)
+                for _ in range(size - 1):
+                    next(reserved)
+                return start
+
+        local = BlockAllocator()
+        local.block_size_setting = "ACCOUNT_NO_BLOCK_SIZE"
+        local.reserve = reserve
+        barrier = threading.Barrier(8)
+        results = []
+
+        def take():
+            barrier.wait()
+            results.append([number for _ in range(200) for number in local.take(3)])
+
+        workers = [threading.Thread(target=take) for _ in range(8)]
+        with self.settings(ACCOUNT_NO_BLOCK_SIZE=50):
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        numbers = [number for result in results for number in result]
+        self.assertEqual(len(numbers), 8 * 200 * 3)
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+
+# SQLite's in-memory test database can't take writes from several threads at once.
+@skipUnlessDBFeature("has_select_for_update")
+class AccountNumberConcurrencyTests(TransactionTestCase):
+    threads = 8
+    accounts_per_thread = 250
+
+    def setUp(self):
+        allocator.reset()
+
+    def test_parallel_registrations_get_unique_numbers(self):
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def register(thread):
+            try:
+                barrier.wait()
+                for n in range(self.accounts_per_thread):
+                    user = User.objects.create(
+                        email=f"t{thread}-{n}@example.com", username=f"t{thread}-{n}"
+                    )
+                    AccountDetails.objects.create(user=user)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=register, args=(thread,)) for thread in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        numbers = list(AccountDetails.objects.values_list("account_no", flat=True))
+        self.assertEqual(len(numbers), self.threads * self.accounts_per_thread)
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="ledger@example.com", username="ledger")
+        self.account = AccountDetails.objects.create(user=self.user)
+
+    def test_entries_move_only_their_column(self):
+        post_entry(self.account, "balance", "100.00", memo="deposit")
+        with self.assertNumQueries(5):
+            # savepoint, insert, F() update, release, refresh
+            post_entry(self.account, "bitcoins", "2.50")
+        self.assertEqual((self.account.balance, self.account.bitcoins), (Decimal("100.00"), Decimal("2.50")))
+        with self.assertRaises(ValueError):
+            entry = LedgerEntry.objects.first()
+            entry.save()
+
+    def test_setters_post_the_difference(self):
+        self.user.balance = Decimal("250.00")
+        self.user.balance = Decimal("200.00")
+        self.assertEqual(
+            list(LedgerEntry.objects.order_by("id").values_list("amount", flat=True)),
+            [Decimal("250.00"), Decimal("-50.00")],
+        )
+        self.assertEqual(AccountDetails.objects.get(pk=self.account.pk).balance, Decimal("200.00"))
+
+    def test_status_changes_keep_concurrent_postings(self):
+        stale = AccountDetails.objects.get(pk=self.account.pk)
+        post_entry(self.account, "balance", "75.00")
+        self.user.status = "VERIFIED"
+        stale.update_balance()
+        account = AccountDetails.objects.get(pk=self.account.pk)
+        self.assertEqual((account.status, account.balance), ("VERIFIED", Decimal("75.00")))
+
+    def test_balance_as_of_uses_snapshot_plus_delta(self):
+        start = timezone.now()
+        for hours, amount in ((3, "100.00"), (2, "-30.00")):
+            entry = post_entry(self.account, "balance", amount)
+            LedgerEntry.objects.filter(pk=entry.pk).update(created_at=start - timedelta(hours=hours))
+        self.assertEqual(take_snapshots(lag=timedelta(minutes=90)), 1)
+        post_entry(self.account, "balance", "5.00")
+
+        snapshot = BalanceSnapshot.objects.get()
+        self.assertEqual(snapshot.balance, Decimal("70.00"))
+        with self.assertNumQueries(2):
+            totals = balance_as_of(self.account, timezone.now())
+        self.assertEqual(totals["balance"], Decimal("75.00"))
+        self.assertEqual(balance_as_of(self.account, start - timedelta(hours=2, minutes=30))["balance"], Decimal("100.00"))
+
+        self.assertEqual(take_snapshots(lag=timedelta(0)), 1)
+        self.assertEqual(BalanceSnapshot.objects.latest("taken_at").balance, Decimal("75.00"))
+
+
+# accounts.urls is not mounted by the project urlconf; tests that post to its views mount it here.
+urlpatterns = [
+    path("", include("bankingsystem.urls")),
+    path("accounts/", include("accounts.urls")),
+]
+
+CHROME_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class LoginTelemetryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("telemetry@example.com", "pw", username="telemetry")
+
+    def test_user_agent_parsing_is_cached(self):
+        parse_user_agent.cache_clear()
+        self.assertEqual(parse_user_agent(CHROME_UA)[2:], ("Windows", "Chrome"))
+        parse_user_agent(CHROME_UA)
+        self.assertEqual(parse_user_agent.cache_info().hits, 1)
+
+    def test_rows_are_queued_until_flushed(self):
+        writer = LoginHistoryWriter(autostart=False)
+        request = RequestFactory().post("/", HTTP_USER_AGENT=CHROME_UA, REMOTE_ADDR="10.0.0.1")
+        for _ in range(3):
+            writer.record(build_login_history(request, self.user, "Successful"))
+        self.assertFalse(LoginHistory.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(writer.flush(), 3)
+        self.assertEqual(len([q for q in queries.captured_queries if "accounts_loginhistory" in q["sql"]]), 1)
+        self.assertEqual(
+            set(LoginHistory.objects.values_list("browser", "ip_address")), {("Chrome", "10.0.0.1")}
+        )
+
+    def test_full_queue_writes_inline(self):
+        writer = LoginHistoryWriter(autostart=False)
+        writer._queue.maxsize = 1
+        request = RequestFactory().post("/", HTTP_USER_AGENT=CHROME_UA)
+        writer.record(build_login_history(request, self.user, "Successful"))
+        writer.record(build_login_history(request, self.user, "Successful"))
+        self.assertEqual(LoginHistory.objects.count(), 1)
+        writer.stop()
+        self.assertEqual(LoginHistory.objects.count(), 2)
+
+    @override_settings(ROOT_URLCONF="accounts.tests")
+    def test_login_view_records_history(self):
+        writer = LoginHistoryWriter(autostart=False)
+        with mock.patch("accounts.views.login_history_writer", writer):
+            response = self.client.post(
+                reverse("accounts:login"), {"username": "telemetry", "password": "pw"}, HTTP_USER_AGENT=CHROME_UA,
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(LoginHistory.objects.exists())
+        writer.flush()
+        self.assertEqual(LoginHistory.objects.get().status, "Successful")
+
+
+class LoginActivityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("activity@example.com", "pw", username="activity")
+        self.request = RequestFactory().post("/", HTTP_USER_AGENT=CHROME_UA)
+
+    def test_history_pages_newest_first(self):
+        start = timezone.now()
+        entries = [build_login_history(self.request, self.user, "Successful") for _ in range(5)]
+        for n, entry in enumerate(entries):
+            # two rows share a timestamp, so the id tiebreak is exercised
+            entry.timestamp = start + timedelta(seconds=min(n, 3))
+        write_login_history(entries)
+        expected = list(LoginHistory.objects.order_by("-timestamp", "-id").values_list("pk", flat=True))
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = latest_logins(self.user, before=cursor, limit=2)
+            seen.extend(row.pk for row in rows)
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_summary_tracks_logins_devices_and_failures(self):
+        ios = RequestFactory().post("/", HTTP_USER_AGENT=(
+            "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 "
+            "(KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1"
+        ))
+        first = build_login_history(self.request, self.user, "Successful")
+        write_login_history([first, build_login_history(self.request, self.user, "Failed")])
+        latest = build_login_history(ios, self.user, "Successful")
+        write_login_history([latest, build_login_history(self.request, self.user, "Successful")])
+
+        summary = LoginSummary.objects.get(user=self.user)
+        self.assertEqual(summary.device_count, 2)
+        self.assertEqual(summary.failure_count, 1)
+        self.assertEqual(summary.last_login_at, max(entry.timestamp for entry in LoginHistory.objects.filter(status="Successful")))
+
+    @override_settings(ROOT_URLCONF="accounts.tests")
+    def test_failed_login_counts_against_the_user(self):
+        writer = LoginHistoryWriter(autostart=False)
+        with mock.patch("accounts.views.login_history_writer", writer):
+            self.client.post(reverse("accounts:login"), {"username": "activity", "password": "wrong"})
+            self.client.post(reverse("accounts:login"), {"username": "activity@example.com", "password": "wrong"})
+            self.client.post(reverse("accounts:login"), {"username": "nobody", "password": "wrong"})
+        writer.flush()
+        self.assertEqual(LoginSummary.objects.get(user=self.user).failure_count, 2)
+        self.assertIsNone(LoginSummary.objects.get(user=self.user).last_login_at)
+
+
+class AccountBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("backend@example.com", "pw", username="backend")
+        self.request = RequestFactory().post("/", REMOTE_ADDR="10.0.0.9")
+
+    def test_email_or_username_in_one_query(self):
+        for identifier in ("backend@example.com", "backend"):
+            with self.assertNumQueries(1):
+                self.assertEqual(authenticate(self.request, username=identifier, password="pw"), self.user)
+
+    def test_failed_login_checks_the_hash_once(self):
+        with mock.patch.object(PBKDF2PasswordHasher, "verify", autospec=True, return_value=False) as verify:
+            self.assertIsNone(authenticate(self.request, username="backend", password="wrong"))
+        self.assertEqual(verify.call_count, 1)
+
+    @override_settings(LOGIN_THROTTLE_ACCOUNT_LIMIT=3)
+    def test_repeated_failures_lock_the_account(self):
+        for _ in range(3):
+            authenticate(self.request, username="backend", password="wrong")
+        other_ip = RequestFactory().post("/", REMOTE_ADDR="10.0.0.10")
+        with self.assertNumQueries(0):
+            self.assertIsNone(authenticate(other_ip, username="BACKEND", password="pw"))
+
+    @override_settings(LOGIN_THROTTLE_IP_LIMIT=2)
+    def test_repeated_failures_lock_the_ip(self):
+        authenticate(self.request, username="nobody", password="x")
+        authenticate(self.request, username="someone", password="x")
+        self.assertIsNone(authenticate(self.request, username="backend", password="pw"))
+        other_ip = RequestFactory().post("/", REMOTE_ADDR="10.0.0.10")
+        self.assertEqual(authenticate(other_ip, username="backend", password="pw"), self.user)
+
+    @override_settings(LOGIN_THROTTLE_IP_LIMIT=2, TRUSTED_PROXY_COUNT=1)
+    def test_ip_limit_is_per_client_behind_the_proxy(self):
+        def via_proxy(client_ip, spoofed):
+            return RequestFactory().post(
+                "/", REMOTE_ADDR="100.64.0.1", HTTP_X_FORWARDED_FOR=f"{spoofed}, {client_ip}"
+            )
+
+        # a forged left-hand entry does not give the client a fresh counter
+        authenticate(via_proxy("203.0.113.5", "1.1.1.1"), username="nobody", password="x")
+        authenticate(via_proxy("203.0.113.5", "2.2.2.2"), username="someone", password="x")
+        self.assertIsNone(authenticate(via_proxy("203.0.113.5", "3.3.3.3"), username="backend", password="pw"))
+        # and other clients behind the same proxy address are not locked out
+        self.assertEqual(authenticate(via_proxy("203.0.113.6", "1.1.1.1"), username="backend", password="pw"), self.user)
+
+
+@override_settings(ROOT_URLCONF="accounts.tests")
+class UserLoaderTests(TestCase):
+    user_tables = ("accounts_user", "accounts_accountdetails", "accounts_useraddress")
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("loader@example.com", "pw", username="loader")
+        AccountDetails.objects.create(user=self.user, balance=Decimal("250.00"))
+        UserAddress.objects.create(
+            user=self.user, street_address="1 Main St", city="Springfield", country="US", state="IL", religion="none",
+        )
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return self.only_user_tables(queries)
+
+    def only_user_tables(self, queries):
+        return [
+            query for query in queries.captured_queries
+            if any(f'FROM "{table}"' in query["sql"] for table in self.user_tables)
+        ]
+
+    def assert_user_queries(self, url):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            # every request: the user with its account and address, one joined query
+            queries = self.user_queries(url)
+            self.assertEqual(len(queries), 1)
+            self.assertIn("JOIN", queries[0]["sql"])
+
+    def test_profile_view(self):
+        self.assert_user_queries(reverse("accounts:view_profile"))
+
+    def test_dashboard_view(self):
+        self.assert_user_queries(reverse("home"))
+
+    def test_account_and_address_come_with_the_user(self):
+        def load_and_read(backend):
+            request = RequestFactory().get("/")
+            request.session = self.client.session
+            request.session[SESSION_KEY], request.session[BACKEND_SESSION_KEY] = str(self.user.pk), backend
+            request.session[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+            with CaptureQueriesContext(connection) as queries:
+                user = get_user(request)
+                user.balance, user.status, user.account_no, user.full_address
+            return self.only_user_tables(queries)
+
+        model_backend = "django.contrib.auth.backends.ModelBackend"
+        with override_settings(AUTHENTICATION_BACKENDS=[model_backend]):
+            self.assertEqual(len(load_and_read(model_backend)), 3)
+        self.assertEqual(len(load_and_read("accounts.backends.AccountBackend")), 1)
+
+    def test_changes_apply_on_the_next_request(self):
+        self.client.force_login(self.user)
+        url = reverse("accounts:view_profile")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        post_entry(self.user.account, "balance", "50.00")
+        self.assertEqual(self.client.get(url).context["user"].balance, Decimal("300.00"))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+@override_settings(ROOT_URLCONF="accounts.tests")
+class UserPickerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user("admin@example.com", "pw", username="admin", is_staff=True)
+        for n in range(25):
+            User.objects.create(email=f"client{n:02d}@example.com", username=f"client{n:02d}")
+        User.objects.create(email="zed@example.com", username="Courier-Zed")
+        self.client.force_login(self.staff)
+
+    def search(self, **params):
+        response = self.client.get(reverse("accounts:user_search"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_prefix_search_on_email_or_username(self):
+        self.assertEqual([user["email"] for user in self.search(q="Client0")["results"]][:1], ["client00@example.com"])
+        self.assertEqual([user["email"] for user in self.search(q="Courier")["results"]], ["zed@example.com"])
+
+    def test_pages_cover_every_match_once(self):
+        emails, after = [], None
+        while True:
+            page = self.search(q="client", **({"after": after} if after else {}))
+            emails.extend(user["email"] for user in page["results"])
+            after = page["next"]
+            if not after:
+                break
+        self.assertEqual(emails, [f"client{n:02d}@example.com" for n in range(25)])
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.get(username="client00"))
+        self.assertEqual(self.client.get(reverse("accounts:user_search")).status_code, 302)
+
+    def test_picker_pages_do_not_list_users(self):
+        self.client.get(reverse("accounts:select_user"))  # caches request.user
+        for name in ("accounts:select_user", "accounts:change_password"):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+            # request.user's own auth columns are re-read by id; nothing lists users
+            self.assertFalse([
+                query for query in queries.captured_queries
+                if 'FROM "accounts_user"' in query["sql"] and '"accounts_user"."id" =' not in query["sql"]
+            ])
+
+
+@override_settings(ROOT_URLCONF="accounts.tests")
+class RegistrationUploadTests(TestCase):
+    def test_picture_upload_does_not_block_registration(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from core.media_uploads import UploadWorkerPool
+        from core.models import MediaUpload
+
+        pool = UploadWorkerPool(autostart=False)
+        with override_settings(MEDIA_UPLOAD_ASYNC=True), mock.patch("core.media_uploads.pool", pool), \
+                mock.patch("cloudinary.uploader.upload_resource") as upload_resource:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("accounts:register"), {
+                    "username": "newcomer",
+                    "email": "newcomer@example.com",
+                    "password1": "Str0ng-passphrase",
+                    "password2": "Str0ng-passphrase",
+                    "picture": SimpleUploadedFile("me.png", b"picture-bytes", content_type="image/png"),
+                })
+            self.assertRedirects(response, reverse("accounts:useremail"), fetch_redirect_response=False)
+            upload_resource.assert_not_called()
+            details = AccountDetails.objects.get(user__username="newcomer")
+            self.assertIn("iconfinder.com", details.picture.public_id)
+            upload = MediaUpload.objects.get()
+            self.assertEqual((upload.model, upload.object_id), ("accounts.accountdetails", str(details.pk)))
+            self.assertEqual(pool._queue.qsize(), 1)
@@ -25,6 +25,12 @@ urlpatterns = [
         name='change_password'
     ),
     
+    re_path(
+        r'^api/users/$',
+        admin_or_superuser_required(user_search),
+        name='user_search'
+    ),
+    
     re_path(r'^login_history/$', login_history, name='login_history'),
     re_path(r'^login_con$', login_con, name='login_con'),
     re_path(r'^useremail$', useremail, name='useremail'),
@@ -0,0 +1,25 @@
+from django.db.models import Q
+
+from .models import User
+
+
+USER_PICKER_PAGE_SIZE = 20
+
+
+def search_users(query="", after=None, limit=USER_PICKER_PAGE_SIZE):
+    """Return ``(users, next_cursor)``: one page of users whose email or username starts with ``query``.
+
+    Prefix matches use the unique email/username indexes (on Postgres
+    Django also gives both a ``varchar_pattern_ops`` index for LIKE),
+    pages are keyed on email, and only id/email/username are loaded.
+    """
+    users = User.objects.only("id", "email", "username")
+    query = (query or "").strip()
+    if query:
+        # stored emails are mostly lowercase; usernames match as typed
+        users = users.filter(Q(email__startswith=query.lower()) | Q(username__startswith=query))
+    if after:
+        users = users.filter(email__gt=after)
+    page = list(users.order_by("email")[:limit + 1])
+    next_cursor = page[limit - 1].email if len(page) > limit else None
+    return page[:limit], next_cursor
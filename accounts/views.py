@@ -9,6 +9,7 @@ from django.contrib.auth.decorators import login_required
 from django.http import Http404
 from .models import *
 from .forms import *
+from core.media_uploads import schedule_uploads, stage_uploads
 
 from django.shortcuts import render, redirect
 import requests
@@ -42,7 +43,9 @@ def admin_or_superuser_required(view_func):
 def view_profile(request):
     user = request.user
     context = {
-        'user': user
+        'user': user,
+        # maintained as history is written, so the page never scans LoginHistory
+        'login_summary': LoginSummary.objects.filter(user=user).first(),
     }
     return render(request, 'accounts/profile.html', context)
 
@@ -59,8 +62,8 @@ def change_password_view(request):
 
         messages.success(request, f"Password for user {user.username} has been changed successfully.")
     
-    users = User.objects.all()
-    return render(request, 'accounts/change_password.html', {'users': users})
+    # users are picked through the user_search endpoint, not listed here
+    return render(request, 'accounts/change_password.html')
 
 def register_view(request):
     if request.user.is_authenticated:
@@ -74,8 +77,10 @@ def register_view(request):
                 user = user_form.save()
                 account_details = account_form.save(commit=False)
                 account_details.user = user
-                account_details.account_no = user.username
+                # the picture goes to Cloudinary in the background, not in this request
+                staged_uploads = stage_uploads(account_details)
                 account_details.save()
+                schedule_uploads(account_details, staged_uploads)
 
                 # Update the address object with the full country name
 
@@ -117,7 +122,8 @@ def useremail(request):
 def login_con(request):
     return render(request, 'accounts/login_con.html')
    
-from user_agents import parse
+from .login_activity import latest_logins
+from .login_telemetry import build_login_history, writer as login_history_writer
 
 
 def login_view(request):
@@ -133,39 +139,18 @@ def login_view(request):
             if user is not None:
                 # Log in the user
                 login(request, user)
-                user_agent = parse(request.META['HTTP_USER_AGENT'])
 
-                # Extract device information
-                device_type = user_agent.device.family
-                device_name = user_agent.device.model
-
-                # Extract operating system and browser information
-                operating_system = user_agent.os.family
-                browser = user_agent.browser.family
-
-                # Get the client IP address
-                ip_address = request.META.get('REMOTE_ADDR')
-
-                # Get the location information from the IP address
-                location = None
-
-
-                # Create a login history entry
-                LoginHistory.objects.create(
-                    user=user,
-                    status='Successful',
-                    operating_system=operating_system,
-                    browser=browser,
-                    device_type=device_type,
-                    device_name=device_name,
-                    location=location,
-                    ip_address=ip_address
-                )
+                # queued; a background thread inserts it after the redirect is sent
+                login_history_writer.record(build_login_history(request, user, 'Successful'))
 
                 message = f"Login Successful. Welcome back, {user.username}. Your authentication was successful."
                 messages.success(request, message)
                 return redirect('home')
             else:
+                # set by AccountBackend when the email or username matched an account
+                failed_user = getattr(request, 'login_failed_user', None)
+                if failed_user is not None:
+                    login_history_writer.record(build_login_history(request, failed_user, 'Failed'))
                 messages.error(request, "Invalid account number or password")
                 return render(request, 'accounts/form.html', {'form': form})
         else:
@@ -179,11 +164,15 @@ def login_view(request):
 
 
 
+@login_required
 def login_history(request):
-    # Retrieve login history for the current user
-    user_login_history = LoginHistory.objects.filter(user=request.user)
+    # one newest-first page of the current user's history; ?before= continues it
+    user_login_history, next_cursor = latest_logins(request.user, before=request.GET.get('before'))
 
-    return render(request, 'accounts/login_history.html', {'login_history': user_login_history})
+    return render(request, 'accounts/login_history.html', {
+        'login_history': user_login_history,
+        'next_cursor': next_cursor,
+    })
 
 
 def logout_view(request):
@@ -195,13 +184,25 @@ def logout_view(request):
 
 
 def select_user(request):
-    users = User.objects.all()
-    return render(request, 'accounts/select_user.html', {'users': users})    
+    return render(request, 'accounts/select_user.html')    
 
 
 def airline(request):
-    users = User.objects.all()
-    return render(request, 'accounts/airline.html', {'users': users})    
+    return render(request, 'accounts/airline.html')    
+
+
+from django.http import JsonResponse
+
+from .user_search import search_users
+
+
+def user_search(request):
+    # typeahead for the staff user pickers: ?q= prefix, ?after= next page
+    users, next_cursor = search_users(request.GET.get('q', ''), after=request.GET.get('after'))
+    return JsonResponse({
+        'results': [{'id': user.pk, 'email': user.email, 'username': user.username} for user in users],
+        'next': next_cursor,
+    })
 
 
 def decrypt_password_view(request):
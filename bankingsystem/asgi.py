@@ -0,0 +1,18 @@
+"""
+ASGI config for bankingsystem project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``gunicorn -k uvicorn.workers.UvicornWorker
+bankingsystem.asgi``) to hold live tracking streams open.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bankingsystem.settings")
+
+application = get_asgi_application()
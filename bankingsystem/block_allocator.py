@@ -0,0 +1,54 @@
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+
+class BlockAllocator:
+    """Hands out unique numbers from a block reserved by this process.
+
+    Subclasses implement ``reserve(size)``, which durably reserves ``size``
+    consecutive numbers and returns the first, and name the setting that
+    holds the block size. Spare blocks are only kept from reservations
+    committed on their own; callers already inside a transaction reserve
+    exactly what they use.
+    """
+
+    block_size_setting = None
+    default_block_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._next = self._end = 0
+        self._pid = None
+
+    def reserve(self, size):
+        raise NotImplementedError
+
+    def take(self, count):
+        """Return ``count`` unused numbers."""
+        block_size = getattr(settings, self.block_size_setting, self.default_block_size)
+        with self._lock:
+            if self._pid != os.getpid():
+                # a forked worker must not keep handing out its parent's block
+                self.reset()
+                self._pid = os.getpid()
+            taken = min(count, self._end - self._next)
+            numbers = list(range(self._next, self._next + taken))
+            self._next += taken
+            missing = count - taken
+            if not missing:
+                return numbers
+            if connection.in_atomic_block:
+                # a reservation made inside a transaction disappears if it rolls
+                # back, so take only what this call uses and keep no spare block
+                start = self.reserve(missing)
+                return numbers + list(range(start, start + missing))
+            size = max(block_size, missing)
+            start = self.reserve(size)
+            self._next, self._end = start + missing, start + size
+            return numbers + list(range(start, start + missing))
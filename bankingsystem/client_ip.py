@@ -0,0 +1,19 @@
+from django.conf import settings
+
+
+def get_client_ip(request):
+    """The client address as seen by the outermost trusted proxy.
+
+    Each of the ``TRUSTED_PROXY_COUNT`` proxies in front of the app appends
+    the address it received from to ``X-Forwarded-For``, so the entry that
+    many places from the right is the last one a client could not forge;
+    anything left of it came from the client itself. With no trusted
+    proxies (or a request that skipped them) ``REMOTE_ADDR`` is used.
+    """
+    proxies = getattr(settings, "TRUSTED_PROXY_COUNT", 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")]
+        forwarded = [part for part in forwarded if part]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR")
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past ``row`` (by its timestamp and pk)."""
+    return f"{(row.timestamp - _EPOCH) // _MICROSECOND}-{row.pk}"
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, pk)`` for a cursor, or None if it is malformed."""
+    try:
+        micros, pk = cursor.split("-", 1)
+        return _EPOCH + int(micros) * _MICROSECOND, int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def newest_first_page(queryset, before=None, limit=20):
+    """Return ``(rows, next_cursor)`` for one page of ``queryset``, newest ``timestamp`` first.
+
+    ``before`` is a cursor from a previous page. With an index ending in
+    (timestamp, id) every page costs O(limit), however deep it is.
+    """
+    position = decode_cursor(before) if before else None
+    if position:
+        timestamp, pk = position
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+    page = list(queryset.order_by("-timestamp", "-id")[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
@@ -1,3 +1,8 @@
+import time
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
 from django.contrib import admin
 
 # Register your models here.
@@ -7,17 +12,33 @@ from .models import Courier
 
 from django.contrib import admin
 from django.utils.html import format_html
+from django.contrib.postgres.search import SearchQuery
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Q
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
+from django.utils.text import smart_split, unescape_string_literal
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import *
+from bankingsystem.admin_actions import CSVExportMixin
+from .admin_pagination import EstimatedCountPaginator, KeysetChangeList
+from .admin_filters import FacetCountFieldListFilter
+from .media_uploads import schedule_uploads, stage_uploads
+from .facets import FACET_FIELDS, apply_facet_deltas, facet_deltas
+from .timeline import record_bulk_events
+from .thumbnails import THUMBNAIL_SIZES, thumbnail_url
+from .tracking_cache import invalidate_tracking_ids
+from .tracking_ids import allocator
+
 
+# Shipments cloned and inserted per bulk_create by duplicate_shipments.
+DUPLICATE_CHUNK_SIZE = 500
 
 
 @admin.register(NewsletterSubscriber)
-class NewsletterSubscriberAdmin(admin.ModelAdmin):
+class NewsletterSubscriberAdmin(CSVExportMixin, admin.ModelAdmin):
     list_display = ('email_display', 'status_badge', 'subscribed_at', 'ip_address')
     list_filter = ('is_active', 'subscribed_at')
     search_fields = ('email', 'ip_address')
@@ -80,7 +101,7 @@ class NewsletterSubscriberAdmin(admin.ModelAdmin):
 
 
 @admin.register(Courier)
-class CourierAdmin(admin.ModelAdmin):
+class CourierAdmin(CSVExportMixin, admin.ModelAdmin):
     """Enhanced admin for managing courier shipments with modern UX and powerful features."""
     
     # List Display with Visual Enhancements
@@ -97,8 +118,8 @@ class CourierAdmin(admin.ModelAdmin):
     
     # Advanced Filtering
     list_filter = (
-        "service",
-        "status",
+        ("service", FacetCountFieldListFilter),
+        ("status", FacetCountFieldListFilter),
         "date_sent",
         "expected_arrival",
     )
@@ -116,6 +137,11 @@ class CourierAdmin(admin.ModelAdmin):
     
     # Date Hierarchy for easy navigation
     date_hierarchy = "date_sent"
+
+    # CSV export columns (the search vector is internal)
+    csv_export_fields = [
+        field.attname for field in Courier._meta.concrete_fields if field.name != "search_vector"
+    ]
     
     # Ordering
     ordering = ("-date_sent", "-created_at")
@@ -134,6 +160,10 @@ class CourierAdmin(admin.ModelAdmin):
     list_per_page = 25
     list_max_show_all = 100
     
+    # Keyset pages and planner-estimated counts (see core.admin_pagination)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
     # Enable actions on top and bottom
     actions_on_top = True
     actions_on_bottom = True
@@ -367,24 +397,36 @@ class CourierAdmin(admin.ModelAdmin):
     def package_preview(self, obj):
         """Display package image preview."""
         if obj.package_image:
-            return format_html(
-                '<img src="{}" style="max-width: 300px; max-height: 200px; '
-                'border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);" />',
-                obj.package_image.url
-            )
+            return self._image_preview(obj, "package_image", "preview")
         return format_html('<em style="color: #999;">No image uploaded</em>')
     
     @admin.display(description="ID Document")
     def id_document_preview(self, obj):
         """Display ID document preview."""
         if obj.id_document:
-            return format_html(
-                '<img src="{}" style="max-width: 300px; max-height: 200px; '
-                'border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);" />',
-                obj.id_document.url
-            )
+            return self._image_preview(obj, "id_document", "preview")
         return format_html('<em style="color: #999;">No document uploaded</em>')
     
+    @admin.display(description="Package")
+    def package_thumbnail(self, obj):
+        """Small package thumbnail for the changelist (COURIER_ADMIN_THUMBNAILS)."""
+        if obj.package_image:
+            return self._image_preview(obj, "package_image", "list")
+        return "—"
+    
+    def _image_preview(self, obj, field_name, size):
+        # a resized variant, lazy-loaded; the link still opens the original
+        width, height, _ = THUMBNAIL_SIZES[size]
+        return format_html(
+            '<a href="{}" target="_blank" rel="noopener"><img src="{}" loading="lazy" decoding="async" '
+            'style="max-width: {}px; max-height: {}px; border-radius: 8px; '
+            'box-shadow: 0 2px 8px rgba(0,0,0,0.1);" /></a>',
+            getattr(obj, field_name).url,
+            thumbnail_url(obj, field_name, size),
+            width,
+            height,
+        )
+    
     @admin.display(description="Map Location")
     def map_preview(self, obj):
         """Display embedded map preview."""
@@ -401,81 +443,176 @@ class CourierAdmin(admin.ModelAdmin):
     @admin.action(description="⚙️ Mark selected as Processing")
     def mark_as_processing(self, request, queryset):
         """Mark selected shipments as processing."""
-        updated = queryset.update(status="processing")
+        updated = self._update_shipments(queryset, status="processing")
         self.message_user(request, f"{updated} shipment(s) marked as Processing.", level="success")
     
     @admin.action(description="🚚 Mark selected as In Transit")
     def mark_as_in_transit(self, request, queryset):
         """Mark selected shipments as in transit."""
-        updated = queryset.update(status="in_transit")
+        updated = self._update_shipments(queryset, status="in_transit")
         self.message_user(request, f"{updated} shipment(s) marked as In Transit.", level="success")
     
     @admin.action(description="🏢 Mark selected as Arrived at Hub")
     def mark_as_arrived_at_hub(self, request, queryset):
         """Mark selected shipments as arrived at hub."""
-        updated = queryset.update(status="arrived_at_hub")
+        updated = self._update_shipments(queryset, status="arrived_at_hub")
         self.message_user(request, f"{updated} shipment(s) marked as Arrived at Hub.", level="success")
     
     @admin.action(description="🚛 Mark selected as Out for Delivery")
     def mark_as_out_for_delivery(self, request, queryset):
         """Mark selected shipments as out for delivery."""
-        updated = queryset.update(status="out_for_delivery")
+        updated = self._update_shipments(queryset, status="out_for_delivery")
         self.message_user(request, f"{updated} shipment(s) marked as Out for Delivery.", level="success")
     
     @admin.action(description="✓ Mark selected as Delivered")
     def mark_as_delivered(self, request, queryset):
         """Mark selected shipments as delivered."""
-        updated = queryset.update(status="delivered")
+        updated = self._update_shipments(queryset, status="delivered")
         self.message_user(request, f"{updated} shipment(s) marked as Delivered.", level="success")
     
     @admin.action(description="⚠️ Mark selected as Delayed")
     def mark_as_delayed(self, request, queryset):
         """Mark selected shipments as delayed."""
-        updated = queryset.update(status="delayed")
+        updated = self._update_shipments(queryset, status="delayed")
         self.message_user(request, f"{updated} shipment(s) marked as Delayed.", level="warning")
     
     @admin.action(description="⏸️ Mark selected as On Hold")
     def mark_as_on_hold(self, request, queryset):
         """Mark selected shipments as on hold."""
-        updated = queryset.update(status="on_hold")
+        updated = self._update_shipments(queryset, status="on_hold")
         self.message_user(request, f"{updated} shipment(s) marked as On Hold.", level="warning")
     
     @admin.action(description="↩️ Mark selected as Returned")
     def mark_as_returned(self, request, queryset):
         """Mark selected shipments as returned to sender."""
-        updated = queryset.update(status="returned")
+        updated = self._update_shipments(queryset, status="returned")
         self.message_user(request, f"{updated} shipment(s) marked as Returned.", level="warning")
     
     @admin.action(description="📋 Duplicate selected shipments")
     def duplicate_shipments(self, request, queryset):
         """Duplicate selected shipments with new tracking IDs."""
-        import uuid
-        count = 0
-        for shipment in queryset:
-            shipment.pk = None
-            shipment.tracking_id = str(uuid.uuid4())[:12].upper()
-            shipment.status = "processing"
-            shipment.save()
-            count += 1
-        
+        started = time.perf_counter()
+        now = timezone.now()
+        clones = []
+        try:
+            with transaction.atomic():
+                # the source rows are read by pk chunk, so the clones being
+                # inserted can never show up in a still-open result set
+                pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+                for start in range(0, len(pks), DUPLICATE_CHUNK_SIZE):
+                    chunk = list(Courier.objects.filter(pk__in=pks[start:start + DUPLICATE_CHUNK_SIZE]))
+                    tracking_ids = allocator.issue_many(shipment.service for shipment in chunk)
+                    for shipment, tracking_id in zip(chunk, tracking_ids):
+                        shipment.pk = None
+                        shipment._state.adding = True
+                        shipment.tracking_id = tracking_id
+                        shipment.status = "processing"
+                    Courier.objects.bulk_create(chunk)
+                    apply_facet_deltas(facet_deltas(chunk))
+                    record_bulk_events(
+                        [(shipment.pk, shipment.status, shipment.current_location) for shipment in chunk],
+                        source="bulk_action",
+                        timestamp=now,
+                    )
+                    clones.extend(shipment.tracking_id for shipment in chunk)
+        except IntegrityError:
+            # an issued ID clashed with a hand-entered one; nothing was saved
+            self.message_user(request, "Duplication failed, no shipments were created. Please retry.", level="error")
+            return
+        invalidate_tracking_ids(clones)
+
         self.message_user(
             request,
-            f"{count} shipment(s) duplicated successfully with new tracking IDs.",
+            f"{len(clones)} shipment(s) duplicated successfully with new tracking IDs "
+            f"in {time.perf_counter() - started:.2f}s.",
             level="success"
         )
-    
+
     @admin.action(description="🗓️ Clear expected arrival dates")
     def clear_expected_arrival(self, request, queryset):
         """Clear expected arrival dates for selected shipments."""
-        updated = queryset.update(expected_arrival=None)
+        updated = self._update_shipments(queryset, expected_arrival=None)
         self.message_user(
             request,
             f"Expected arrival cleared for {updated} shipment(s).",
             level="warning"
         )
     
+    def _update_shipments(self, queryset, **fields):
+        """Bulk-update shipments, log timeline events, move facet counts and drop cached tracking records."""
+        now = timezone.now()
+        # update() skips auto_now, but the tracking API's ETag depends on it
+        fields.setdefault("updated_at", now)
+        with transaction.atomic():
+            rows = list(queryset.values(
+                "pk", "tracking_id", "status", "current_location", "service", "date_sent"
+            ))
+            updated = queryset.update(**fields)
+            if "status" in fields or "current_location" in fields:
+                record_bulk_events(
+                    [
+                        (
+                            row["pk"],
+                            fields.get("status", row["status"]),
+                            fields.get("current_location", row["current_location"]),
+                        )
+                        for row in rows
+                    ],
+                    source="bulk_action",
+                    timestamp=now,
+                )
+            if FACET_FIELDS.intersection(fields):
+                deltas = facet_deltas(rows, sign=-1)
+                deltas.update(facet_deltas([{**row, **fields} for row in rows]))
+                apply_facet_deltas(deltas)
+        invalidate_tracking_ids([row["tracking_id"] for row in rows])
+        return updated
+    
+    # ============= Indexed Search =============
+    
+    def get_search_fields(self, request):
+        """On Postgres, remarks is matched through its full-text vector instead of icontains."""
+        if connection.vendor == "postgresql":
+            return tuple(field for field in self.search_fields if field != "remarks")
+        return self.search_fields
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Search via the trigram and full-text indexes on Postgres; plain icontains elsewhere.
+
+        Like Django's own search, every word must match at least one field;
+        on Postgres remarks matches a word when one of its words starts with it.
+        """
+        if not search_term or connection.vendor != "postgresql":
+            return super().get_search_results(request, queryset, search_term)
+        lookups = [f"{field}__icontains" for field in self.get_search_fields(request)]
+        word_queries = []
+        for word in smart_split(search_term):
+            if word.startswith(('"', "'")) and word[0] == word[-1]:
+                word = unescape_string_literal(word)
+            if not word:
+                continue
+            # a quoted, escaped lexeme with :* is a prefix match in tsquery syntax
+            lexeme = "'" + word.replace("\\", "\\\\").replace("'", "''") + "':*"
+            word_queries.append(
+                reduce(or_, (Q(**{lookup: word}) for lookup in lookups))
+                | Q(search_vector=SearchQuery(lexeme, search_type="raw", config="simple"))
+            )
+        if not word_queries:
+            return queryset, False
+        return queryset.filter(reduce(and_, word_queries)), False
+    
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+    
     # ============= QuerySet Optimization =============
     
+    def get_list_display(self, request):
+        """Add the package thumbnail column when COURIER_ADMIN_THUMBNAILS is on."""
+        list_display = super().get_list_display(request)
+        if getattr(settings, "COURIER_ADMIN_THUMBNAILS", False):
+            return (list_display[0], "package_thumbnail") + tuple(list_display[1:])
+        return list_display
+    
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
         qs = super().get_queryset(request)
@@ -523,6 +660,10 @@ class CourierAdmin(admin.ModelAdmin):
         for field_name, help_text in help_texts.items():
             if field_name in form.base_fields:
                 form.base_fields[field_name].help_text = help_text
+
+        # left blank, save_model issues one from the tracking ID allocator
+        if "tracking_id" in form.base_fields:
+            form.base_fields["tracking_id"].required = False
         
         # Enhance textarea widgets
         if "remarks" in form.base_fields:
@@ -561,7 +702,12 @@ class CourierAdmin(admin.ModelAdmin):
     
     def save_model(self, request, obj, form, change):
         """Save with custom notification."""
+        if not obj.tracking_id:
+            obj.tracking_id = allocator.issue(obj.service)
+        # images are pushed to Cloudinary in the background, not in this request
+        staged_uploads = stage_uploads(obj)
         super().save_model(request, obj, form, change)
+        schedule_uploads(obj, staged_uploads)
         
         if change:
             self.message_user(
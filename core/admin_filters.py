@@ -0,0 +1,20 @@
+from django.contrib.admin.filters import ChoicesFieldListFilter
+
+from .facets import facet_counts
+
+
+class FacetCountFieldListFilter(ChoicesFieldListFilter):
+    """Choices filter that labels each choice with its count from the facet summary.
+
+    Counts come from the maintained CourierFacet rows, so they cover the whole
+    table regardless of other active filters and cost one small query.
+    """
+
+    def choices(self, changelist):
+        counts = facet_counts(self.field_path)
+        lookups = {str(title): lookup for lookup, title in self.field.flatchoices}
+        for choice in super().choices(changelist):
+            lookup = lookups.get(str(choice["display"]))
+            if lookup is not None:
+                choice = {**choice, "display": f"{choice['display']} ({counts.get(lookup, 0):,})"}
+            yield choice
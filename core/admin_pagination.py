@@ -0,0 +1,152 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+CURSOR_VAR = "cursor"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def estimate_count(queryset):
+    """Planner row estimate for ``queryset`` on Postgres, or None where unavailable."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    if not queryset.query.where:
+        # unfiltered: the table statistics are enough, no need to plan anything
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been analyzed
+        return row[0] if row and row[0] >= 0 else None
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the planner's row estimate once it passes a threshold.
+
+    Below ``ADMIN_COUNT_ESTIMATE_THRESHOLD`` rows, or off Postgres, it counts exactly.
+    """
+
+    is_estimated = False
+
+    @cached_property
+    def count(self):
+        threshold = getattr(settings, "ADMIN_COUNT_ESTIMATE_THRESHOLD", 10000)
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= threshold:
+            self.is_estimated = True
+            return estimate
+        return super().count
+
+
+def _encode_cursor(direction, obj):
+    return "{}.{}.{}.{}".format(
+        direction,
+        (obj.date_sent - _EPOCH) // _MICROSECOND,
+        (obj.created_at - _EPOCH) // _MICROSECOND,
+        obj.pk,
+    )
+
+
+def _decode_cursor(cursor):
+    try:
+        direction, date_sent, created_at, pk = cursor.split(".")
+        if direction not in ("after", "before"):
+            return None
+        return direction, (
+            _EPOCH + int(date_sent) * _MICROSECOND,
+            _EPOCH + int(created_at) * _MICROSECOND,
+            int(pk),
+        )
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist that pages by a (date_sent, created_at, pk) cursor instead of OFFSET.
+
+    Keyset paging applies to the default ``-date_sent, -created_at`` ordering;
+    sorting by another column falls back to the usual numbered pages.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        cursor = self.params.pop(CURSOR_VAR, None)
+        self.keyset = ORDER_VAR not in self.params
+        self.newer_url = self.older_url = None
+        if not self.keyset:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        result_count = paginator.count
+        if self.model_admin.show_full_result_count:
+            full_result_count = self.root_queryset.count()
+        else:
+            full_result_count = None
+        can_show_all = result_count <= self.list_max_show_all
+        multi_page = result_count > self.list_per_page
+
+        if (self.show_all and can_show_all) or not multi_page:
+            result_list = self.queryset._clone()
+        else:
+            result_list = self._keyset_page(cursor)
+
+        self.result_count = result_count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.show_admin_actions = not self.show_full_result_count or bool(full_result_count)
+        self.full_result_count = full_result_count
+        self.result_list = result_list
+        self.can_show_all = can_show_all
+        self.multi_page = multi_page
+        self.paginator = paginator
+
+    def _keyset_page(self, cursor):
+        position = _decode_cursor(cursor) if cursor else None
+        queryset = self.queryset
+        limit = self.list_per_page
+
+        if position is None:
+            rows = list(queryset[:limit + 1])
+            has_newer, has_older = False, len(rows) > limit
+            rows = rows[:limit]
+        else:
+            direction, (date_sent, created_at, pk) = position
+            if direction == "after":
+                rows = list(queryset.filter(
+                    Q(date_sent__lt=date_sent)
+                    | Q(date_sent=date_sent, created_at__lt=created_at)
+                    | Q(date_sent=date_sent, created_at=created_at, pk__lt=pk)
+                )[:limit + 1])
+                has_newer, has_older = True, len(rows) > limit
+                rows = rows[:limit]
+            else:
+                rows = list(queryset.filter(
+                    Q(date_sent__gt=date_sent)
+                    | Q(date_sent=date_sent, created_at__gt=created_at)
+                    | Q(date_sent=date_sent, created_at=created_at, pk__gt=pk)
+                ).reverse()[:limit + 1])
+                has_newer, has_older = len(rows) > limit, True
+                rows = rows[:limit][::-1]
+
+        if rows and has_newer:
+            self.newer_url = self.get_query_string({CURSOR_VAR: _encode_cursor("before", rows[0])})
+        if rows and has_older:
+            self.older_url = self.get_query_string({CURSOR_VAR: _encode_cursor("after", rows[-1])})
+        return rows
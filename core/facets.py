@@ -0,0 +1,82 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Courier, CourierFacet
+
+
+# Courier fields whose changes move facet counts.
+FACET_FIELDS = {"status", "service", "date_sent"}
+
+
+def month_key(value):
+    """Facet key for the month a datetime falls in, in the current time zone."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def facet_keys(status, service, date_sent):
+    return [("status", status), ("service", service), ("month", month_key(date_sent))]
+
+
+def facet_deltas(couriers, sign=1):
+    """Counter of facet changes from adding (sign=1) or removing (sign=-1) shipments.
+
+    ``couriers`` may be Courier instances or dicts with status/service/date_sent.
+    """
+    deltas = Counter()
+    for courier in couriers:
+        if isinstance(courier, dict):
+            keys = facet_keys(courier["status"], courier["service"], courier["date_sent"])
+        else:
+            keys = facet_keys(courier.status, courier.service, courier.date_sent)
+        for key in keys:
+            deltas[key] += sign
+    return deltas
+
+
+def apply_facet_deltas(deltas):
+    """Add each delta to its facet row with an atomic F() update, creating rows as needed."""
+    for (kind, key), delta in deltas.items():
+        if not delta:
+            continue
+        updated = CourierFacet.objects.filter(kind=kind, key=key).update(count=F("count") + delta)
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                CourierFacet.objects.create(kind=kind, key=key, count=delta)
+        except IntegrityError:
+            # another writer created the row first
+            CourierFacet.objects.filter(kind=kind, key=key).update(count=F("count") + delta)
+
+
+def facet_counts(kind):
+    """Return ``{key: count}`` for one facet kind, skipping empty buckets."""
+    return dict(
+        CourierFacet.objects.filter(kind=kind, count__gt=0).values_list("key", "count")
+    )
+
+
+@transaction.atomic
+def rebuild_facets():
+    """Recompute every facet from the Courier table (a full scan, for repairs only)."""
+    CourierFacet.objects.all().delete()
+    rows = []
+    for field in ("status", "service"):
+        for value in Courier.objects.order_by().values(field).annotate(n=Count("id")):
+            rows.append(CourierFacet(kind=field, key=value[field], count=value["n"]))
+    months = (
+        Courier.objects.order_by()
+        .annotate(month=TruncMonth("date_sent"))
+        .values("month")
+        .annotate(n=Count("id"))
+    )
+    for value in months:
+        rows.append(CourierFacet(kind="month", key=month_key(value["month"]), count=value["n"]))
+    CourierFacet.objects.bulk_create(rows)
+    return len(rows)
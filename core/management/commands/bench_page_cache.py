@@ -0,0 +1,42 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure anonymous requests/sec for a public page with the page cache "
+        "off and on. Requests go through the full middleware stack in-process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/", help="Page to request.")
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args, **options):
+        path, count = options["path"], options["requests"]
+        if count < 1:
+            raise CommandError("--requests must be at least 1.")
+        client = Client()
+
+        def run():
+            started = time.perf_counter()
+            for _ in range(count):
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise CommandError(f"{path} returned {response.status_code}.")
+            return count / (time.perf_counter() - started)
+
+        with override_settings(PAGE_CACHE_ENABLED=False):
+            uncached = run()
+        # a throwaway version keeps the run away from real cached pages
+        with override_settings(PAGE_CACHE_VERSION=f"bench-{uuid.uuid4().hex}"):
+            client.get(path)  # fills the cache entry
+            cached = run()
+
+        self.stdout.write(f"{count} requests to {path}")
+        self.stdout.write(f"page cache off: {uncached:.0f} req/s")
+        self.stdout.write(f"page cache on:  {cached:.0f} req/s")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {cached / uncached:.1f}x"))
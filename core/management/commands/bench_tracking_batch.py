@@ -0,0 +1,78 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Courier
+from core.tracking_cache import get_couriers, invalidate_tracking_ids
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare N single tracking lookups with one batch lookup. "
+        "Runs on throwaway shipments inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=500, help="Number of tracking IDs.")
+        parser.add_argument(
+            "--missing",
+            type=int,
+            default=10,
+            help="Percentage of requested IDs that do not exist.",
+        )
+
+    def handle(self, *args, **options):
+        size = options["size"]
+        prefix = f"BENCH-{uuid.uuid4().hex[:8].upper()}-"
+        existing = size - size * options["missing"] // 100
+        tracking_ids = [f"{prefix}{n}" for n in range(size)]
+
+        try:
+            with transaction.atomic():
+                Courier.objects.bulk_create(
+                    Courier(
+                        tracking_id=tracking_id,
+                        service="NeoLite-Logistics",
+                        sender_name="Benchmark",
+                        receiver_name="Benchmark",
+                    )
+                    for tracking_id in tracking_ids[:existing]
+                )
+
+                with CaptureQueriesContext(connection) as single_queries:
+                    started = time.perf_counter()
+                    for tracking_id in tracking_ids:
+                        couriers = Courier.objects.filter(tracking_id=tracking_id)
+                        if couriers.exists():
+                            couriers.first()
+                    single_elapsed = time.perf_counter() - started
+
+                invalidate_tracking_ids(tracking_ids)
+                with CaptureQueriesContext(connection) as batch_queries:
+                    started = time.perf_counter()
+                    get_couriers(tracking_ids)
+                    batch_elapsed = time.perf_counter() - started
+                invalidate_tracking_ids(tracking_ids)
+
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{size} tracking IDs ({size - existing} missing)")
+        self.stdout.write(
+            f"single lookups: {single_elapsed * 1000:.1f} ms, "
+            f"{len(single_queries.captured_queries)} queries"
+        )
+        self.stdout.write(
+            f"batch lookup:   {batch_elapsed * 1000:.1f} ms, "
+            f"{len(batch_queries.captured_queries)} queries"
+        )
+        if batch_elapsed:
+            self.stdout.write(self.style.SUCCESS(f"speedup: {single_elapsed / batch_elapsed:.1f}x"))
@@ -0,0 +1,283 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.facets import apply_facet_deltas, facet_deltas
+from core.models import Courier
+from core.timeline import record_bulk_events
+from core.tracking_cache import invalidate_tracking_ids
+from core.tracking_ids import allocator, is_valid_tracking_id
+
+
+# Columns an import may set; everything else keeps the model default.
+IMPORT_FIELDS = [
+    field.name
+    for field in Courier._meta.concrete_fields
+    if field.editable
+    and not field.primary_key
+    and field.name not in ("created_at", "updated_at", "package_image", "id_document")
+]
+
+# Errors printed one by one before only the total is reported.
+MAX_REPORTED_ERRORS = 20
+
+
+def _read_csv(handle):
+    reader = csv.DictReader(handle)
+    unknown = set(reader.fieldnames or ()) - set(IMPORT_FIELDS)
+    if unknown:
+        raise CommandError(f"Unknown CSV columns: {', '.join(sorted(unknown))}")
+    yield from reader
+
+
+def _read_jsonl(handle):
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            record = ValueError(f"invalid JSON: {exc}")
+        yield record
+
+
+class Command(BaseCommand):
+    help = (
+        "Import shipments from a CSV or JSONL file (or '-' for stdin) in batches. "
+        "Rows without a tracking_id get one from the tracking ID allocator. "
+        "Rows are validated against the Courier model; each batch commits on its "
+        "own and is recorded in a checkpoint file, so an interrupted import "
+        "resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV/JSONL file to import, or '-' to read stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format. Defaults to the file extension (csv unless .jsonl/.ndjson).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--on-conflict",
+            choices=["skip", "update"],
+            default="skip",
+            help="What to do with rows whose tracking_id already exists.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file. Defaults to <path>.checkpoint; not used for stdin.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and import from the first row.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        fmt = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        checkpoint_path = options["checkpoint"] or (None if path == "-" else f"{path}.checkpoint")
+
+        done = 0
+        if checkpoint_path and not options["restart"] and os.path.exists(checkpoint_path):
+            done = self._load_checkpoint(checkpoint_path, path)
+            self.stdout.write(f"Resuming after {done} rows from {checkpoint_path}")
+
+        if path == "-":
+            handle = sys.stdin
+        else:
+            try:
+                handle = open(path, newline="", encoding="utf-8-sig")
+            except OSError as exc:
+                raise CommandError(f"Cannot open {path}: {exc}")
+
+        totals = {"inserted": 0, "updated": 0, "skipped": 0, "invalid": 0}
+        self._reported = 0
+        started = time.perf_counter()
+        processed = 0
+        try:
+            records = _read_csv(handle) if fmt == "csv" else _read_jsonl(handle)
+            # already-committed rows are read again but not validated or written
+            records = enumerate(islice(records, done, None), start=done + 1)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                counts = self._import_batch(batch, options["on_conflict"])
+                for key, value in counts.items():
+                    totals[key] += value
+                processed += len(batch)
+                done += len(batch)
+                if checkpoint_path:
+                    self._save_checkpoint(checkpoint_path, path, done)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{done} rows read, {processed / elapsed if elapsed else 0:.0f} rows/s"
+                )
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {processed} rows in {elapsed:.1f}s "
+            f"({processed / elapsed if elapsed else 0:.0f} rows/s): "
+            f"inserted={totals['inserted']} updated={totals['updated']} "
+            f"skipped={totals['skipped']} invalid={totals['invalid']}"
+        ))
+
+    def _import_batch(self, batch, on_conflict):
+        """Validate and write one batch in its own transaction; returns per-outcome counts."""
+        counts = {"inserted": 0, "updated": 0, "skipped": 0, "invalid": 0}
+        rows = []
+        for number, record in batch:
+            if not isinstance(record, dict):
+                self._report(number, record if isinstance(record, Exception) else "not a JSON object")
+                counts["invalid"] += 1
+                continue
+            values, error = self._clean_values(record)
+            if error:
+                self._report(number, error)
+                counts["invalid"] += 1
+                continue
+            rows.append((number, values))
+
+        now = timezone.now()
+        with transaction.atomic():
+            tracking_ids = [values["tracking_id"] for _, values in rows]
+            existing = {
+                courier.tracking_id: courier
+                for courier in Courier.objects.filter(tracking_id__in=tracking_ids).order_by()
+            }
+            previous = {
+                tracking_id: {
+                    "status": courier.status,
+                    "service": courier.service,
+                    "date_sent": courier.date_sent,
+                    "current_location": courier.current_location,
+                }
+                for tracking_id, courier in existing.items()
+            }
+
+            to_create, to_update, update_fields, seen = [], [], set(), set()
+            for number, values in rows:
+                tracking_id = values["tracking_id"]
+                if tracking_id in seen or (tracking_id in existing and on_conflict == "skip"):
+                    # a repeated ID within the batch counts as a conflict too
+                    counts["skipped"] += 1
+                    continue
+                seen.add(tracking_id)
+                courier = existing.get(tracking_id) or Courier()
+                for name, value in values.items():
+                    setattr(courier, name, value)
+                try:
+                    courier.full_clean(validate_unique=False, validate_constraints=False)
+                except ValidationError as exc:
+                    self._report(number, exc)
+                    counts["invalid"] += 1
+                    continue
+                if timezone.is_naive(courier.date_sent):
+                    courier.date_sent = timezone.make_aware(courier.date_sent)
+                if courier.expected_arrival and timezone.is_naive(courier.expected_arrival):
+                    courier.expected_arrival = timezone.make_aware(courier.expected_arrival)
+                if courier.pk:
+                    courier.updated_at = now
+                    update_fields.update(values)
+                    to_update.append(courier)
+                else:
+                    to_create.append(courier)
+
+            Courier.objects.bulk_create(to_create)
+            if to_update:
+                Courier.objects.bulk_update(to_update, sorted(update_fields | {"updated_at"}))
+
+            deltas = facet_deltas(to_create)
+            deltas.update(facet_deltas([previous[courier.tracking_id] for courier in to_update], sign=-1))
+            deltas.update(facet_deltas(to_update))
+            apply_facet_deltas(deltas)
+            record_bulk_events(
+                [(courier.pk, courier.status, courier.current_location) for courier in to_create]
+                + [
+                    (courier.pk, courier.status, courier.current_location)
+                    for courier in to_update
+                    if (courier.status, courier.current_location)
+                    != (previous[courier.tracking_id]["status"], previous[courier.tracking_id]["current_location"])
+                ],
+                source="import",
+                timestamp=now,
+            )
+        # new IDs may be negatively cached from earlier failed lookups
+        invalidate_tracking_ids(tracking_ids)
+
+        counts["inserted"] += len(to_create)
+        counts["updated"] += len(to_update)
+        return counts
+
+    def _clean_values(self, record):
+        """Map a raw record onto importable fields; returns ``(values, error)``."""
+        unknown = set(record) - set(IMPORT_FIELDS)
+        if unknown:
+            return None, f"unknown fields: {', '.join(sorted(unknown))}"
+        values = {}
+        for name, value in record.items():
+            field = Courier._meta.get_field(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in ("", None) and (field.has_default() or field.null):
+                # empty cells keep the model default (or NULL)
+                continue
+            values[name] = value
+        if not values.get("tracking_id"):
+            values["tracking_id"] = allocator.issue(values.get("service"))
+        elif not is_valid_tracking_id(str(values["tracking_id"])):
+            return None, "tracking_id: malformed (check character does not match)"
+        return values, None
+
+    def _report(self, number, error):
+        self._reported += 1
+        if self._reported <= MAX_REPORTED_ERRORS:
+            if isinstance(error, ValidationError) and hasattr(error, "message_dict"):
+                error = "; ".join(
+                    f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items()
+                )
+            self.stderr.write(f"row {number}: {error}")
+        elif self._reported == MAX_REPORTED_ERRORS + 1:
+            self.stderr.write("further invalid rows are counted but not listed")
+
+    def _load_checkpoint(self, checkpoint_path, path):
+        try:
+            with open(checkpoint_path) as handle:
+                checkpoint = json.load(handle)
+            done = int(checkpoint["rows"])
+        except (OSError, ValueError, KeyError, TypeError):
+            raise CommandError(f"Unreadable checkpoint {checkpoint_path}; use --restart to ignore it.")
+        if checkpoint.get("source") != os.path.abspath(path):
+            raise CommandError(
+                f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('source')}; "
+                "use --restart to ignore it."
+            )
+        return done
+
+    def _save_checkpoint(self, checkpoint_path, path, done):
+        # write-then-rename, so a crash never leaves a half-written checkpoint
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump({"source": os.path.abspath(path), "rows": done}, handle)
+        os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,104 @@
+import asyncio
+import resource
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold many idle connections open against a live tracking stream, e.g. "
+        "http://127.0.0.1:8000/core/api/track/<tracking_id>/stream/ served over ASGI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Stream URL to connect to.")
+        parser.add_argument("--connections", type=int, default=2000)
+        parser.add_argument("--hold", type=float, default=60, help="Seconds to keep connections open.")
+        parser.add_argument("--ramp", type=int, default=200, help="New connections opened per batch.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Only plain http:// URLs are supported.")
+
+        # every connection is a file descriptor on this side too
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = options["connections"] + 100
+        if soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+        stats = asyncio.run(self._run(url, options))
+        self.stdout.write(
+            f"opened={stats['opened']} failed={stats['failed']} "
+            f"still_open={stats['still_open']} events={stats['events']} "
+            f"connect_p50={stats['p50'] * 1000:.1f}ms connect_max={stats['max'] * 1000:.1f}ms"
+        )
+
+    async def _run(self, url, options):
+        path = url.path + (f"?{url.query}" if url.query else "")
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {url.netloc}\r\n"
+            "Accept: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n\r\n"
+        ).encode()
+        stats = {"opened": 0, "failed": 0, "events": 0, "connect_times": []}
+        alive = set()
+        stop = asyncio.Event()
+
+        async def client(connected):
+            started = time.monotonic()
+            try:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                if b" 200 " not in status_line:
+                    raise ConnectionError(status_line)
+            except (OSError, ConnectionError):
+                stats["failed"] += 1
+                connected.set_result(False)
+                return
+            stats["opened"] += 1
+            stats["connect_times"].append(time.monotonic() - started)
+            alive.add(writer)
+            connected.set_result(True)
+            try:
+                while not stop.is_set():
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    if line.startswith(b"event:"):
+                        stats["events"] += 1
+            except OSError:
+                pass
+            finally:
+                alive.discard(writer)
+                writer.close()
+
+        loop = asyncio.get_running_loop()
+        tasks = []
+        ramp_started = time.monotonic()
+        for start in range(0, options["connections"], options["ramp"]):
+            batch = [loop.create_future() for _ in range(min(options["ramp"], options["connections"] - start))]
+            tasks.extend(asyncio.create_task(client(connected)) for connected in batch)
+            # open the next batch only once this one is established (or failed)
+            await asyncio.gather(*batch)
+        self.stdout.write(
+            f"{len(alive)} connections open after {time.monotonic() - ramp_started:.1f}s, "
+            f"holding for {options['hold']:.0f}s"
+        )
+
+        await asyncio.sleep(options["hold"])
+        stats["still_open"] = len(alive)
+        stop.set()
+        for writer in list(alive):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        connect_times = sorted(stats.pop("connect_times")) or [0.0]
+        stats["p50"] = connect_times[len(connect_times) // 2]
+        stats["max"] = connect_times[-1]
+        return stats
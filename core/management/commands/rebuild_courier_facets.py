@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = "Recount the shipment facets (status, service, month sent) from the Courier table."
+
+    def handle(self, *args, **options):
+        rows = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} facet rows."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.media_uploads import process_upload, release_stale_uploads
+from core.models import MediaUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Push staged media uploads that are still pending, e.g. ones queued in "
+        "a process that has since exited, after putting back any left "
+        "uploading by a worker that died. With --failed, uploads that ran out "
+        "of attempts are retried as well. Run it on deploy and from a cron job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help="Also retry uploads marked failed, starting their attempt count over.",
+        )
+
+    def handle(self, *args, **options):
+        released = release_stale_uploads()
+        if released:
+            self.stdout.write(f"Released {released} stale uploads back to pending.")
+        if options["failed"]:
+            MediaUpload.objects.filter(status=MediaUpload.FAILED).update(status=MediaUpload.PENDING, attempts=0)
+        upload_ids = list(
+            MediaUpload.objects.filter(status=MediaUpload.PENDING).order_by("created_at", "id").values_list("pk", flat=True)
+        )
+        stored = sum(1 for upload_id in upload_ids if process_upload(upload_id))
+        remaining = MediaUpload.objects.filter(status=MediaUpload.FAILED).count()
+        self.stdout.write(self.style.SUCCESS(f"Stored {stored} of {len(upload_ids)} pending uploads."))
+        if remaining:
+            self.stdout.write(self.style.WARNING(f"{remaining} uploads have failed; rerun with --failed to retry them."))
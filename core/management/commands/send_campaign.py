@@ -0,0 +1,158 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from core.models import NewsletterSubscriber
+from core.newsletter import unsubscribe_token
+
+
+UNSUBSCRIBE_PLACEHOLDER = "__unsubscribe_url__"
+
+
+class Command(BaseCommand):
+    help = (
+        "Send a newsletter campaign to every active subscriber. The template is "
+        "rendered once; subscribers are read in batches and messages go out "
+        "one at a time over one email backend connection, paced to --rate per "
+        "second. Each message carries its own unsubscribe link and "
+        "List-Unsubscribe header. Progress is recorded in a checkpoint file "
+        "after every message, so an interrupted run resumes after the last "
+        "subscriber it reached."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("campaign", help="Campaign name; identifies its checkpoint.")
+        parser.add_argument("--subject", required=True)
+        parser.add_argument(
+            "--template",
+            default="core/emails/newsletter",
+            help="Template name without extension: <name>.txt is required, <name>.html is optional.",
+        )
+        parser.add_argument("--from-email", default=None, help="Defaults to DEFAULT_FROM_EMAIL.")
+        parser.add_argument("--batch-size", type=int, default=100, help="Subscribers read per query.")
+        parser.add_argument(
+            "--site-url",
+            default=getattr(settings, "NEWSLETTER_SITE_URL", ""),
+            help="Site address for unsubscribe links. Defaults to NEWSLETTER_SITE_URL.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=getattr(settings, "NEWSLETTER_SEND_RATE", 10),
+            help="Messages per second; 0 sends as fast as the backend accepts them.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file. Defaults to <campaign>.checkpoint.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and send from the first subscriber.",
+        )
+
+    def handle(self, *args, **options):
+        campaign = options["campaign"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if options["rate"] < 0:
+            raise CommandError("--rate cannot be negative.")
+        checkpoint_path = options["checkpoint"] or f"{campaign}.checkpoint"
+
+        if not options["site_url"]:
+            raise CommandError("--site-url (or NEWSLETTER_SITE_URL) is needed for unsubscribe links.")
+        site_url = options["site_url"].rstrip("/")
+
+        # rendered once; each message swaps in its own unsubscribe link
+        context = {"subject": options["subject"], "campaign": campaign, "unsubscribe_url": UNSUBSCRIBE_PLACEHOLDER}
+        text_body = render_to_string(f"{options['template']}.txt", context)
+        try:
+            html_body = render_to_string(f"{options['template']}.html", context)
+        except TemplateDoesNotExist:
+            html_body = None
+
+        last_pk, sent = 0, 0
+        if not options["restart"] and os.path.exists(checkpoint_path):
+            last_pk, sent = self._load_checkpoint(checkpoint_path, campaign)
+            self.stdout.write(f"Resuming after subscriber {last_pk} ({sent} already sent)")
+
+        from_email = options["from_email"] or settings.DEFAULT_FROM_EMAIL
+        started = time.monotonic()
+        sent_this_run = 0
+        connection = get_connection()
+        connection.open()
+        try:
+            while True:
+                # keyset cursor: each batch is an index range scan from the last pk
+                batch = list(
+                    NewsletterSubscriber.objects.filter(is_active=True, pk__gt=last_pk)
+                    .order_by("pk")
+                    .values_list("pk", "email")[:batch_size]
+                )
+                if not batch:
+                    break
+                for pk, email in batch:
+                    if options["rate"]:
+                        # message n of this run may not leave before n / rate seconds
+                        wait = sent_this_run / options["rate"] - (time.monotonic() - started)
+                        if wait > 0:
+                            time.sleep(wait)
+                    unsubscribe_url = site_url + reverse("core:newsletter_unsubscribe", args=[unsubscribe_token(pk)])
+                    message = EmailMultiAlternatives(
+                        options["subject"],
+                        text_body.replace(UNSUBSCRIBE_PLACEHOLDER, unsubscribe_url),
+                        from_email,
+                        [email],
+                        connection=connection,
+                        headers={
+                            "List-Unsubscribe": f"<{unsubscribe_url}>",
+                            "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+                        },
+                    )
+                    if html_body is not None:
+                        message.attach_alternative(html_body.replace(UNSUBSCRIBE_PLACEHOLDER, unsubscribe_url), "text/html")
+                    connection.send_messages([message])
+
+                    last_pk = pk
+                    sent += 1
+                    sent_this_run += 1
+                    self._save_checkpoint(checkpoint_path, campaign, last_pk, sent)
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{sent} sent, {sent_this_run / elapsed if elapsed else 0:.1f} messages/s")
+        finally:
+            connection.close()
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Campaign {campaign!r} sent to {sent} subscribers ({sent_this_run} in this run)."
+        ))
+
+    def _load_checkpoint(self, checkpoint_path, campaign):
+        try:
+            with open(checkpoint_path) as handle:
+                checkpoint = json.load(handle)
+            last_pk, sent = int(checkpoint["last_pk"]), int(checkpoint["sent"])
+        except (OSError, ValueError, KeyError, TypeError):
+            raise CommandError(f"Unreadable checkpoint {checkpoint_path}; use --restart to ignore it.")
+        if checkpoint.get("campaign") != campaign:
+            raise CommandError(
+                f"Checkpoint {checkpoint_path} belongs to campaign {checkpoint.get('campaign')!r}; "
+                "use --restart to ignore it."
+            )
+        return last_pk, sent
+
+    def _save_checkpoint(self, checkpoint_path, campaign, last_pk, sent):
+        # write-then-rename, so a crash never leaves a half-written checkpoint
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump({"campaign": campaign, "last_pk": last_pk, "sent": sent}, handle)
+        os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,251 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from cloudinary import uploader
+from cloudinary.models import CloudinaryField
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import MediaUpload
+
+
+logger = logging.getLogger(__name__)
+
+
+class CloudinaryUploadBackend:
+    """Uploads with the same options ``CloudinaryField.pre_save`` would use."""
+
+    def upload(self, content, field, instance):
+        options = {"type": field.type, "resource_type": field.resource_type}
+        options.update({key: val(instance) if callable(val) else val for key, val in field.options.items()})
+        return uploader.upload_resource(content, **options)
+
+
+class LocalUploadBackend:
+    """Filesystem stand-in for Cloudinary, for tests and offline development.
+
+    Files are stored under ``MEDIA_UPLOAD_LOCAL_ROOT``, which defaults to the
+    directory ``LocalThumbnailer`` reads originals from, and the field gets
+    the stored name as its public ID.
+    """
+
+    def __init__(self):
+        self.storage = FileSystemStorage(
+            location=getattr(
+                settings, "MEDIA_UPLOAD_LOCAL_ROOT",
+                getattr(settings, "THUMBNAIL_LOCAL_ROOT", os.path.join(settings.MEDIA_ROOT, "local-cloudinary")),
+            ),
+        )
+
+    def upload(self, content, field, instance):
+        extension = os.path.splitext(content.name)[1].lower()
+        return self.storage.save(f"uploads/{uuid.uuid4().hex}{extension}", content)
+
+
+def get_upload_backend():
+    return import_string(getattr(settings, "MEDIA_UPLOAD_BACKEND", "core.media_uploads.CloudinaryUploadBackend"))()
+
+
+def stage_uploads(instance):
+    """Take new files off ``instance``'s Cloudinary fields before it is saved.
+
+    Each uploaded file is read into memory and the field is pointed at its
+    default image, so saving the instance no longer waits on Cloudinary.
+    Pass the result to ``schedule_uploads`` once the instance is saved. With
+    ``MEDIA_UPLOAD_ASYNC = False`` nothing is staged and the field uploads
+    inline on save as before.
+    """
+    if not getattr(settings, "MEDIA_UPLOAD_ASYNC", True):
+        return []
+    staged = []
+    for field in instance._meta.concrete_fields:
+        value = getattr(instance, field.attname)
+        if not isinstance(field, CloudinaryField) or not isinstance(value, UploadedFile):
+            continue
+        data = b"".join(value.chunks())
+        setattr(instance, field.attname, field.get_default())
+        staged.append((field.name, data, value.name or ""))
+    return staged
+
+
+def schedule_uploads(instance, staged):
+    """Store the files ``stage_uploads`` took off ``instance`` and queue them once committed.
+
+    The bytes are kept on the ``MediaUpload`` row rather than on local disk,
+    so any process can push them, including after a redeploy. A newer upload
+    for the same field discards any not yet stored, so a slow older upload
+    cannot overwrite it.
+    """
+    for field_name, data, original_name in staged:
+        target = {"model": instance._meta.label_lower, "object_id": str(instance.pk), "field_name": field_name}
+        MediaUpload.objects.filter(status__in=[MediaUpload.PENDING, MediaUpload.UPLOADING], **target).update(
+            status=MediaUpload.DISCARDED, data=b"",
+        )
+        upload = MediaUpload.objects.create(data=data, original_name=original_name[:255], **target)
+        transaction.on_commit(lambda upload_id=upload.pk: pool.submit(upload_id))
+
+
+def _store(upload, backend):
+    """Push one claimed upload and point the field at it; False if it was no longer wanted."""
+    model = apps.get_model(upload.model)
+    instance = model._default_manager.filter(pk=upload.object_id).first()
+    if instance is None:
+        return False
+    field = model._meta.get_field(upload.field_name)
+    content = ContentFile(bytes(upload.data), name=upload.original_name or "upload")
+    value = backend.upload(content, field, instance)
+    with transaction.atomic():
+        current = MediaUpload.objects.select_for_update().only("status").get(pk=upload.pk)
+        if current.status != MediaUpload.UPLOADING:
+            # discarded for a newer upload while this one was in flight
+            return False
+        instance = model._default_manager.select_for_update().filter(pk=upload.object_id).first()
+        if instance is None:
+            return False
+        setattr(instance, field.attname, value)
+        update_fields = [field.name]
+        if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+            # bumps the thumbnail cache key
+            update_fields.append("updated_at")
+        # save() rather than a queryset update, so the model's signals see the
+        # change (cache invalidation); update_fields keeps it to these columns
+        instance.save(update_fields=update_fields)
+        MediaUpload.objects.filter(pk=upload.pk).update(
+            status=MediaUpload.DONE, attempts=upload.attempts, data=b"", completed_at=timezone.now(),
+        )
+    return True
+
+
+def process_upload(upload_id):
+    """Push one pending upload to storage, retrying with backoff; returns True once stored.
+
+    The row is first claimed by moving it from pending to uploading, so a
+    worker thread and ``retry_media_uploads`` never push the same file
+    twice. After ``MEDIA_UPLOAD_MAX_ATTEMPTS`` failures the upload is marked
+    failed and its bytes kept for ``retry_media_uploads --failed``.
+    """
+    claimed = MediaUpload.objects.filter(pk=upload_id, status=MediaUpload.PENDING).update(
+        status=MediaUpload.UPLOADING, started_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+    upload = MediaUpload.objects.get(pk=upload_id)
+    backend = get_upload_backend()
+    max_attempts = getattr(settings, "MEDIA_UPLOAD_MAX_ATTEMPTS", 5)
+    delay = getattr(settings, "MEDIA_UPLOAD_RETRY_DELAY", 2)
+    while True:
+        upload.attempts += 1
+        try:
+            stored = _store(upload, backend)
+            break
+        except Exception as exc:
+            upload.last_error = f"{type(exc).__name__}: {exc}"
+            if upload.attempts >= max_attempts:
+                logger.exception("Giving up on media upload %s after %d attempts", upload.pk, upload.attempts)
+                MediaUpload.objects.filter(pk=upload.pk, status=MediaUpload.UPLOADING).update(
+                    status=MediaUpload.FAILED, attempts=upload.attempts, last_error=upload.last_error,
+                )
+                return False
+            logger.warning("Media upload %s failed (attempt %d): %s", upload.pk, upload.attempts, exc)
+            # started_at doubles as a heartbeat for release_stale_uploads
+            still_wanted = MediaUpload.objects.filter(pk=upload.pk, status=MediaUpload.UPLOADING).update(
+                attempts=upload.attempts, last_error=upload.last_error, started_at=timezone.now(),
+            )
+            if not still_wanted:
+                return False
+            time.sleep(delay * 2 ** (upload.attempts - 1))
+    if not stored:
+        # the target row is gone; a newer upload has already discarded this one
+        MediaUpload.objects.filter(pk=upload.pk, status=MediaUpload.UPLOADING).update(
+            status=MediaUpload.DISCARDED, attempts=upload.attempts, data=b"", completed_at=timezone.now(),
+        )
+    return stored
+
+
+def release_stale_uploads():
+    """Put uploads whose worker died mid-upload back to pending; returns how many.
+
+    An upload counts as stale once it has been uploading for longer than
+    ``MEDIA_UPLOAD_STALE_AFTER`` seconds without another attempt.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "MEDIA_UPLOAD_STALE_AFTER", 15 * 60))
+    return MediaUpload.objects.filter(status=MediaUpload.UPLOADING, started_at__lt=cutoff).update(
+        status=MediaUpload.PENDING,
+    )
+
+
+class UploadWorkerPool:
+    """Daemon threads that push staged uploads to media storage.
+
+    ``submit()`` only enqueues an upload ID; ``MEDIA_UPLOAD_WORKERS`` threads
+    run ``process_upload`` for each. Uploads live in the database, so
+    anything still queued when the process exits stays pending and is
+    picked up by ``retry_media_uploads``.
+    """
+
+    def __init__(self, autostart=True):
+        self.autostart = autostart
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+    def submit(self, upload_id):
+        if self.autostart:
+            self._ensure_threads()
+        self._queue.put(upload_id)
+
+    def flush(self):
+        """Process everything queued so far on the calling thread; returns uploads processed."""
+        processed = 0
+        while True:
+            try:
+                upload_id = self._queue.get_nowait()
+            except queue.Empty:
+                return processed
+            self._process(upload_id)
+            processed += 1
+
+    def _ensure_threads(self):
+        if self._threads and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            # a forked worker inherits the object but not the parent's threads
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"media-upload-{number}", daemon=True)
+                for number in range(max(1, getattr(settings, "MEDIA_UPLOAD_WORKERS", 2)))
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _process(self, upload_id):
+        try:
+            process_upload(upload_id)
+        except Exception:
+            logger.exception("Could not process media upload %s", upload_id)
+
+    def _run(self):
+        try:
+            while True:
+                upload_id = self._queue.get()
+                close_old_connections()
+                self._process(upload_id)
+        finally:
+            connection.close()
+
+
+pool = UploadWorkerPool()
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterSubscriber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(db_index=True, max_length=254, unique=True)),
+                ('subscribed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('is_active', models.BooleanField(default=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Newsletter Subscriber',
+                'verbose_name_plural': 'Newsletter Subscribers',
+                'ordering': ['-subscribed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_newslettersubscriber'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('processing', 'Processing'), ('in_transit', 'In Transit'), ('arrived_at_hub', 'Arrived at Hub'), ('out_for_delivery', 'Out for Delivery'), ('delivered', 'Delivered'), ('delayed', 'Delayed'), ('on_hold', 'On Hold'), ('returned', 'Returned to Sender')], max_length=30)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(choices=[('save', 'Shipment saved'), ('bulk_action', 'Admin bulk action')], default='save', max_length=20)),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.courier')),
+            ],
+            options={
+                'verbose_name': 'Shipment Event',
+                'verbose_name_plural': 'Shipment Events',
+                'ordering': ['-timestamp', '-id'],
+                'indexes': [models.Index(fields=['courier', 'timestamp', 'id'], name='core_event_courier_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+
+
+class PostgresOnlyAddIndex(migrations.AddIndex):
+    """AddIndex that only touches the database on Postgres (GIN/trigram don't exist elsewhere)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+CREATE_SEARCH_TRIGGER = """
+CREATE OR REPLACE FUNCTION core_courier_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('pg_catalog.simple', coalesce(NEW.remarks, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_courier_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF remarks ON core_courier
+    FOR EACH ROW EXECUTE FUNCTION core_courier_search_vector_update();
+
+UPDATE core_courier SET search_vector = to_tsvector('pg_catalog.simple', coalesce(remarks, ''));
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP TRIGGER IF EXISTS core_courier_search_vector_trigger ON core_courier;
+DROP FUNCTION IF EXISTS core_courier_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_TRIGGER)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_courierevent'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='courier',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('tracking_id', models.TextField())), name='gin_trgm_ops'), name='core_courier_tid_trgm'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('sender_name', models.TextField())), name='gin_trgm_ops'), name='core_courier_sname_trgm'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('sender_contact', models.TextField())), name='gin_trgm_ops'), name='core_courier_scontact_trgm'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('receiver_name', models.TextField())), name='gin_trgm_ops'), name='core_courier_rname_trgm'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('receiver_contact', models.TextField())), name='gin_trgm_ops'), name='core_courier_rcontact_trgm'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('current_location', models.TextField())), name='gin_trgm_ops'), name='core_courier_loc_trgm'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='courier',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_courier_search_gin'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
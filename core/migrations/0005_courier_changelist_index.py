@@ -0,0 +1,17 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_courier_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courier',
+            index=models.Index(fields=['-date_sent', '-created_at', '-id'], name='core_courier_changelist_idx'),
+        ),
+    ]
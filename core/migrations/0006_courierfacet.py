@@ -0,0 +1,47 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:23
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def populate_facets(apps, schema_editor):
+    Courier = apps.get_model("core", "Courier")
+    CourierFacet = apps.get_model("core", "CourierFacet")
+    couriers = Courier.objects.using(schema_editor.connection.alias).order_by()
+    rows = []
+    for field in ("status", "service"):
+        for value in couriers.values(field).annotate(n=Count("id")):
+            rows.append(CourierFacet(kind=field, key=value[field], count=value["n"]))
+    months = couriers.annotate(month=TruncMonth("date_sent")).values("month").annotate(n=Count("id"))
+    for value in months:
+        rows.append(CourierFacet(kind="month", key=value["month"].strftime("%Y-%m"), count=value["n"]))
+    CourierFacet.objects.using(schema_editor.connection.alias).bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_courier_changelist_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('status', 'Status'), ('service', 'Service'), ('month', 'Month sent')], max_length=10)),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Shipment Facet',
+                'verbose_name_plural': 'Shipment Facets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='courierfacet',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='core_facet_kind_key_uniq'),
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
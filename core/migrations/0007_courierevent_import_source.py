@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_courierfacet'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='courierevent',
+            name='source',
+            field=models.CharField(choices=[('save', 'Shipment saved'), ('bulk_action', 'Admin bulk action'), ('import', 'Bulk import')], default='save', max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_courierevent_import_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Tracking ID Sequence',
+                'verbose_name_plural': 'Tracking ID Sequences',
+            },
+        ),
+    ]
@@ -7,6 +7,9 @@ from cloudinary.models import CloudinaryField
 
 from django.db import models
 from cloudinary.models import CloudinaryField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Cast, Upper
 from django.utils import timezone
 
 from django.utils.safestring import mark_safe
@@ -91,10 +94,34 @@ class Courier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Full-text vector over remarks, kept current by a Postgres trigger (unused on SQLite)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Shipment"
         verbose_name_plural = "Shipments"
+        # Postgres-only (see migration 0004): trigram indexes on the exact
+        # UPPER(col::text) expression Django emits for icontains, so admin
+        # substring search can use them, plus a GIN index on search_vector.
+        indexes = [
+            GinIndex(
+                OpClass(Upper(Cast(field, models.TextField())), name="gin_trgm_ops"),
+                name=f"core_courier_{abbr}_trgm",
+            )
+            for field, abbr in (
+                ("tracking_id", "tid"),
+                ("sender_name", "sname"),
+                ("sender_contact", "scontact"),
+                ("receiver_name", "rname"),
+                ("receiver_contact", "rcontact"),
+                ("current_location", "loc"),
+            )
+        ] + [
+            GinIndex(fields=["search_vector"], name="core_courier_search_gin"),
+            # keyset pagination of the admin changelist
+            models.Index(fields=["-date_sent", "-created_at", "-id"], name="core_courier_changelist_idx"),
+        ]
 
     def __str__(self):
         return f"{self.tracking_id} - {self.get_status_display()}"
@@ -114,3 +141,109 @@ class Courier(models.Model):
         if self.map_location:
             return mark_safe(self.map_location)
         return ""
+
+
+class CourierEvent(models.Model):
+    """One append-only entry in a shipment's status/location history."""
+
+    SOURCE_CHOICES = [
+        ("save", "Shipment saved"),
+        ("bulk_action", "Admin bulk action"),
+        ("import", "Bulk import"),
+    ]
+
+    courier = models.ForeignKey(Courier, on_delete=models.CASCADE, related_name="events")
+    status = models.CharField(max_length=30, choices=Courier.STATUS_CHOICES)
+    location = models.CharField(max_length=255, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default="save")
+
+    class Meta:
+        ordering = ["-timestamp", "-id"]
+        indexes = [
+            models.Index(fields=["courier", "timestamp", "id"], name="core_event_courier_ts_idx"),
+        ]
+        verbose_name = "Shipment Event"
+        verbose_name_plural = "Shipment Events"
+
+    def __str__(self):
+        return f"{self.courier_id} - {self.get_status_display()} @ {self.timestamp}"
+
+
+class CourierFacet(models.Model):
+    """Maintained shipment counts per status, per service and per month of date_sent."""
+
+    KIND_CHOICES = [
+        ("status", "Status"),
+        ("service", "Service"),
+        ("month", "Month sent"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=50)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="core_facet_kind_key_uniq"),
+        ]
+        verbose_name = "Shipment Facet"
+        verbose_name_plural = "Shipment Facets"
+
+    def __str__(self):
+        return f"{self.kind}:{self.key} = {self.count}"
+
+
+class TrackingIdSequence(models.Model):
+    """Next unreserved tracking ID sequence number; processes reserve blocks from it."""
+
+    name = models.CharField(max_length=20, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Tracking ID Sequence"
+        verbose_name_plural = "Tracking ID Sequences"
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class MediaUpload(models.Model):
+    """An image staged in the database, waiting to be pushed to media storage for one model field."""
+
+    PENDING = "pending"
+    UPLOADING = "uploading"
+    DONE = "done"
+    FAILED = "failed"
+    DISCARDED = "discarded"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (UPLOADING, "Uploading"),
+        (DONE, "Uploaded"),
+        (FAILED, "Failed"),
+        (DISCARDED, "Discarded"),
+    ]
+
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    field_name = models.CharField(max_length=64)
+    # emptied once the upload is stored or discarded
+    data = models.BinaryField(default=b"", editable=False)
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="core_upload_status_idx"),
+        ]
+        verbose_name = "Media Upload"
+        verbose_name_plural = "Media Uploads"
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}.{self.field_name} ({self.status})"
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import NewsletterSubscriber
+
+
+# Outcomes of subscribe().
+SUBSCRIBED = "subscribed"
+REACTIVATED = "reactivated"
+ALREADY_ACTIVE = "already_active"
+
+NEWSLETTER_THROTTLE_PREFIX = "newsletter:attempts:"
+UNSUBSCRIBE_SALT = "core.newsletter.unsubscribe"
+
+
+def allow_attempt(ip_address):
+    """Count a subscription attempt from ``ip_address``; False once it is over the limit."""
+    if not ip_address:
+        return True
+    key = f"{NEWSLETTER_THROTTLE_PREFIX}{ip_address}"
+    window = getattr(settings, "NEWSLETTER_THROTTLE_WINDOW", 60 * 60)
+    if cache.add(key, 1, timeout=window):
+        attempts = 1
+    else:
+        try:
+            attempts = cache.incr(key)
+        except ValueError:
+            # expired between add() and incr(); this attempt opens a new window
+            cache.set(key, 1, timeout=window)
+            attempts = 1
+    return attempts <= getattr(settings, "NEWSLETTER_THROTTLE_LIMIT", 5)
+
+
+def _upsert(email, ip_address, now):
+    # inserts, or flips an inactive row back on; an active row matches the
+    # conflict but not the WHERE, so nothing comes back. subscribed_at only
+    # equals ``now`` on a freshly inserted row.
+    table = connection.ops.quote_name(NewsletterSubscriber._meta.db_table)
+    field = NewsletterSubscriber._meta.get_field
+    now = field("subscribed_at").get_db_prep_value(now, connection)
+    ip_address = field("ip_address").get_db_prep_value(ip_address, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (email, subscribed_at, is_active, ip_address) "
+            f"VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT (email) DO UPDATE SET is_active = %s "
+            f"WHERE {table}.is_active = %s "
+            f"RETURNING subscribed_at = %s",
+            [email, now, True, ip_address, True, False, now],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return ALREADY_ACTIVE
+    return SUBSCRIBED if row[0] else REACTIVATED
+
+
+def _get_or_create(email, ip_address, now):
+    try:
+        with transaction.atomic():
+            NewsletterSubscriber.objects.create(email=email, ip_address=ip_address, subscribed_at=now)
+        return SUBSCRIBED
+    except IntegrityError:
+        # a concurrent request inserted it first
+        reactivated = NewsletterSubscriber.objects.filter(email=email, is_active=False).update(is_active=True)
+        return REACTIVATED if reactivated else ALREADY_ACTIVE
+
+
+def subscribe(email, ip_address=None):
+    """Subscribe ``email`` in one statement; returns SUBSCRIBED, REACTIVATED or ALREADY_ACTIVE.
+
+    Postgres and SQLite use ``INSERT ... ON CONFLICT ... RETURNING``, so
+    concurrent submits of the same address can't collide on the unique
+    email. Other databases insert and fall back to an update on conflict.
+    """
+    now = timezone.now()
+    if connection.vendor == "postgresql" or (
+        connection.vendor == "sqlite" and connection.Database.sqlite_version_info >= (3, 35)
+    ):
+        return _upsert(email, ip_address, now)
+    return _get_or_create(email, ip_address, now)
+
+
+def unsubscribe_token(subscriber_id):
+    """Signed, URL-safe token naming one subscriber, for unsubscribe links."""
+    return signing.dumps(subscriber_id, salt=UNSUBSCRIBE_SALT)
+
+
+def subscriber_from_token(token):
+    """The subscriber ID an unsubscribe token names, or None if it was not signed by us."""
+    try:
+        return int(signing.loads(token, salt=UNSUBSCRIBE_SALT))
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def unsubscribe(subscriber_id):
+    """Stop sending campaigns to the subscriber; the row stays, so re-subscribing reactivates it."""
+    NewsletterSubscriber.objects.filter(pk=subscriber_id).update(is_active=False)
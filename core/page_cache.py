@@ -0,0 +1,90 @@
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.html import escape
+from django.utils.http import quote_etag
+
+
+PAGE_CACHE_PREFIX = "page:"
+
+# Rendered {% csrf_token %} inputs are cut out before caching and refilled per request.
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_CSRF_PLACEHOLDER = b"__page_cache_csrf_token__"
+
+
+def _cache_key(request):
+    version = getattr(settings, "PAGE_CACHE_VERSION", "1")
+    language = getattr(request, "LANGUAGE_CODE", None) or translation.get_language()
+    digest = hashlib.md5(request.path.encode("utf-8")).hexdigest()
+    return f"{PAGE_CACHE_PREFIX}{version}:{language}:{digest}"
+
+
+def _page_cache():
+    return caches[getattr(settings, "PAGE_CACHE_ALIAS", "default")]
+
+
+def _cacheable(request):
+    if not getattr(settings, "PAGE_CACHE_ENABLED", True) or request.method not in ("GET", "HEAD"):
+        return False
+    # keyed on the path alone, so arbitrary ?query variants cannot fill the cache
+    if request.META.get("QUERY_STRING"):
+        return False
+    # signed-in pages are personal, and a pending message must be rendered and consumed
+    return not request.user.is_authenticated and not len(messages.get_messages(request))
+
+
+def _serve(request, entry):
+    content, content_type, has_csrf = entry
+    max_age = getattr(settings, "PAGE_CACHE_MAX_AGE", 300)
+    if has_csrf:
+        # Always a full body: a 304 would skip get_token(), which also makes
+        # CsrfViewMiddleware set the cookie, and a browser revalidating after
+        # its cookie rotated would keep a form with a stale token.
+        content = content.replace(_CSRF_PLACEHOLDER, escape(get_token(request)).encode("ascii"))
+        response = HttpResponse(content, content_type=content_type)
+        # the token is tied to this visitor's cookie; shared caches must not keep it
+        patch_cache_control(response, private=True, max_age=max_age)
+    else:
+        etag = quote_etag(hashlib.md5(content).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+def cache_public_page(view):
+    """Serve an anonymous page from the cache, keyed by deploy version, language and path.
+
+    Signed-in visitors, requests with pending messages or a query string,
+    and anything other than a 200 for GET/HEAD go straight to the view.
+    Responses carry ``Cache-Control: max-age`` and, unless the page has a
+    CSRF form, an ETag. CSRF pages are cached with the token cut out,
+    refilled per request and marked private.
+    """
+    @wraps(view)
+    def _wrapped_view(request, *args, **kwargs):
+        if not _cacheable(request):
+            return view(request, *args, **kwargs)
+        key = _cache_key(request)
+        entry = _page_cache().get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming or response.cookies:
+                return response
+            content, holes = _CSRF_INPUT.subn(rb"\1" + _CSRF_PLACEHOLDER + rb"\2", response.content)
+            entry = (content, response["Content-Type"], bool(holes))
+            _page_cache().set(key, entry, timeout=getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60))
+        return _serve(request, entry)
+
+    return _wrapped_view
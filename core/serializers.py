@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from .models import Courier
+
+
+class CourierTrackingSerializer(serializers.ModelSerializer):
+    """Public tracking view of a shipment, as shown on the tracking page."""
+
+    service_display = serializers.CharField(source="get_service_display", read_only=True)
+    status_display = serializers.CharField(source="get_status_display", read_only=True)
+
+    class Meta:
+        model = Courier
+        fields = (
+            "tracking_id",
+            "service",
+            "service_display",
+            "status",
+            "status_display",
+            "sender_name",
+            "receiver_name",
+            "current_location",
+            "quantity",
+            "weight_kg",
+            "date_sent",
+            "expected_arrival",
+            "updated_at",
+        )
+        read_only_fields = fields
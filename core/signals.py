@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .facets import apply_facet_deltas, facet_deltas
+from .models import Courier, CourierEvent
+from .tracking_cache import invalidate_tracking_ids
+
+
+@receiver(pre_save, sender=Courier)
+def remember_previous_state(sender, instance, *args, **kwargs):
+    # a renamed tracking ID must also drop the entry cached under the old one,
+    # and the old values decide on timeline events and facet count moves
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = (
+            Courier.objects.filter(pk=instance.pk)
+            .values("tracking_id", "status", "current_location", "service", "date_sent")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Courier)
+def invalidate_saved_courier(sender, instance, *args, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    invalidate_tracking_ids([instance.tracking_id, previous["tracking_id"] if previous else None])
+
+
+@receiver(post_save, sender=Courier)
+def record_courier_event(sender, instance, created, *args, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    if (
+        created
+        or not previous
+        or (previous["status"], previous["current_location"]) != (instance.status, instance.current_location)
+    ):
+        CourierEvent.objects.create(
+            courier=instance,
+            status=instance.status,
+            location=instance.current_location,
+            source="save",
+        )
+
+
+@receiver(post_save, sender=Courier)
+def update_courier_facets(sender, instance, created, *args, **kwargs):
+    deltas = facet_deltas([instance])
+    previous = getattr(instance, "_previous_state", None)
+    if previous and not created:
+        deltas.update(facet_deltas([previous], sign=-1))
+    apply_facet_deltas(deltas)
+
+
+@receiver(post_delete, sender=Courier)
+def invalidate_deleted_courier(sender, instance, *args, **kwargs):
+    invalidate_tracking_ids([instance.tracking_id])
+
+
+@receiver(post_delete, sender=Courier)
+def remove_deleted_courier_facets(sender, instance, *args, **kwargs):
+    apply_facet_deltas(facet_deltas([instance], sign=-1))
@@ -0,0 +1,116 @@
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+# Written next to the collected files: original name -> its generated variants.
+RESPONSIVE_MANIFEST = "responsive-images.json"
+
+RESPONSIVE_EXTENSIONS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG"}
+_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+_SAVE_OPTIONS = {
+    "JPEG": {"quality": 82, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 80, "method": 6},
+}
+
+
+def variant_name(name, width, fmt):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{width}w.{'webp' if fmt == 'WEBP' else ext.lstrip('.')}"
+
+
+def build_variants(image, name, widths):
+    """Yield ``(variant_name, width, format, bytes)`` for each resized copy of ``image``.
+
+    Every width below the original gets a WebP copy and one in the original
+    format; the original width gets WebP only, since the source file itself
+    is the fallback at that size.
+    """
+    fmt = RESPONSIVE_EXTENSIONS[os.path.splitext(name)[1].lower()]
+    if fmt == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    for width in sorted({w for w in widths if w < image.width} | {image.width}):
+        if width == image.width:
+            resized = image
+        else:
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for target in ("WEBP", fmt) if width < image.width else ("WEBP",):
+            buffer = io.BytesIO()
+            resized.save(buffer, target, **_SAVE_OPTIONS[target])
+            yield variant_name(name, width, target), width, target, buffer.getvalue()
+
+
+class ResponsiveStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise's hashed + precompressed storage, plus resized image variants.
+
+    During ``collectstatic`` every JPEG/PNG gets WebP and same-format copies at
+    ``RESPONSIVE_IMAGE_WIDTHS``; they are hashed and compressed along with
+    everything else, and listed in ``RESPONSIVE_MANIFEST`` for the
+    ``responsive_image`` template tag.
+    """
+
+    # Vendored files whose url()s and source maps point at files that were
+    # never shipped (owl.carousel's video icon, Font Awesome's webfonts,
+    # Bootstrap's .map files, admin_soft's copies of Django admin CSS); those
+    # references keep their plain URL instead of failing collectstatic.
+    # Anywhere else a missing file is an error.
+    vendored_files = (
+        "assetz/css/bootstrap.css",
+        "assetz/css/owl.carousel.css",
+        "assetz/css/owl.carousel.min.css",
+        "assetz/js/bootstrap.bundle.js",
+        "css/fontawesome.css",
+        "css/forms.css",
+        "css/owl.css",
+        "css/widgets.css",
+        "js/soft-ui-dashboard.min.js",
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self._build_responsive_images(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+        if name not in self.vendored_files:
+            return converter
+
+        def lenient_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj["matched"]
+
+        return lenient_converter
+
+    def _build_responsive_images(self, paths):
+        widths = getattr(settings, "RESPONSIVE_IMAGE_WIDTHS", (120, 480, 960, 1600))
+        manifest = {}
+        for name in sorted(paths):
+            if os.path.splitext(name)[1].lower() not in RESPONSIVE_EXTENSIONS:
+                continue
+            storage, path = paths[name]
+            with storage.open(path) as handle:
+                image = Image.open(handle)
+                image.load()
+            sources = []
+            for generated, width, fmt, content in build_variants(image, name, widths):
+                if self.exists(generated):
+                    self.delete(generated)
+                self._save(generated, ContentFile(content))
+                # hashed and compressed by the rest of post_process
+                paths[generated] = (self, generated)
+                sources.append({"name": generated, "width": width, "type": _MIME_TYPES[fmt]})
+            manifest[name] = {"width": image.width, "height": image.height, "sources": sources}
+        if self.exists(RESPONSIVE_MANIFEST):
+            self.delete(RESPONSIVE_MANIFEST)
+        self._save(RESPONSIVE_MANIFEST, ContentFile(json.dumps(manifest, indent=1).encode("utf-8")))
@@ -0,0 +1,89 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import Courier
+
+
+STATUS_LABELS = dict(Courier.STATUS_CHOICES)
+
+# Distinguishes "not polled yet" from a shipment that no longer exists (None).
+_UNSET = object()
+
+
+def fetch_tracking_state(tracking_id):
+    """Return the public live-tracking fields for a shipment, or None if it is gone."""
+    rows = list(
+        Courier.objects.filter(tracking_id=tracking_id)
+        .order_by()
+        .values_list("status", "current_location", "updated_at")[:1]
+    )
+    if not rows:
+        return None
+    status, location, updated_at = rows[0]
+    return {
+        "status": status,
+        "status_display": STATUS_LABELS.get(status, status),
+        "location": location,
+        "updated_at": updated_at.isoformat(),
+    }
+
+
+def _offer(queue, state):
+    # Subscribers only care about the latest state, so a slow reader drops stale ones.
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(state)
+
+
+class TrackingFeed:
+    """A single change feed for one tracking ID, shared by all of its subscribers."""
+
+    def __init__(self, tracking_id):
+        self.tracking_id = tracking_id
+        self.subscribers = set()
+        self.last_state = _UNSET
+        self.task = None
+
+    async def run(self):
+        interval = getattr(settings, "TRACKING_STREAM_POLL_INTERVAL", 2)
+        while self.subscribers:
+            state = await sync_to_async(fetch_tracking_state)(self.tracking_id)
+            if state != self.last_state:
+                self.last_state = state
+                for queue in list(self.subscribers):
+                    _offer(queue, state)
+            await asyncio.sleep(interval)
+
+
+class TrackingFeedHub:
+    """In-process broker: one polling task per watched tracking ID, fanned out to queues."""
+
+    def __init__(self):
+        self.feeds = {}
+
+    def subscribe(self, tracking_id):
+        feed = self.feeds.get(tracking_id)
+        if feed is None:
+            feed = self.feeds[tracking_id] = TrackingFeed(tracking_id)
+        queue = asyncio.Queue(maxsize=1)
+        if feed.last_state is not _UNSET:
+            queue.put_nowait(feed.last_state)
+        feed.subscribers.add(queue)
+        if feed.task is None or feed.task.done():
+            feed.task = asyncio.get_running_loop().create_task(feed.run())
+        return queue
+
+    def unsubscribe(self, tracking_id, queue):
+        feed = self.feeds.get(tracking_id)
+        if feed is None:
+            return
+        feed.subscribers.discard(queue)
+        if not feed.subscribers:
+            del self.feeds[tracking_id]
+            if feed.task is not None:
+                feed.task.cancel()
+
+
+hub = TrackingFeedHub()
@@ -0,0 +1,81 @@
+import datetime
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from core.facets import facet_counts
+
+
+register = template.Library()
+
+
+def courier_date_hierarchy(cl):
+    """Year and month levels of the date_sent hierarchy, served from the month facets.
+
+    The facets count the whole table, so they only stand in for Django's
+    MIN/MAX and DISTINCT queries when no search or other filter is active.
+    The day level, and any filtered view, use Django's own implementation.
+    """
+    field_name = cl.date_hierarchy
+    field_generic = "%s__" % field_name
+    year_field = "%s__year" % field_name
+    month_field = "%s__month" % field_name
+    other_filters = [key for key in cl.get_filters_params() if not key.startswith(field_generic)]
+    if cl.query or other_filters or cl.params.get(month_field) or cl.params.get("%s__day" % field_name):
+        return date_hierarchy(cl)
+
+    months = sorted(
+        datetime.date(int(key[:4]), int(key[5:7]), 1)
+        for key in facet_counts("month")
+    )
+    if len(months) < 2:
+        # a single month opens at the day level, which the facets do not cover
+        return date_hierarchy(cl)
+
+    def link(filters):
+        return cl.get_query_string(filters, [field_generic])
+
+    year_lookup = cl.params.get(year_field)
+    if not year_lookup and months[0].year == months[-1].year:
+        year_lookup = months[0].year
+
+    if year_lookup:
+        try:
+            year = int(year_lookup)
+        except ValueError:
+            return date_hierarchy(cl)
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in months
+                if month.year == year
+            ],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [
+            {"link": link({year_field: str(year)}), "title": str(year)}
+            for year in sorted({month.year for month in months})
+        ],
+    }
+
+
+@register.tag(name="courier_date_hierarchy")
+def courier_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=courier_date_hierarchy,
+        template_name="date_hierarchy.html",
+        takes_context=False,
+    )
@@ -0,0 +1,61 @@
+import json
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.storage import RESPONSIVE_MANIFEST
+
+
+register = template.Library()
+
+
+@lru_cache(maxsize=1)
+def responsive_manifest():
+    """The variant list written by collectstatic; empty until it has run."""
+    try:
+        with staticfiles_storage.open(RESPONSIVE_MANIFEST) as handle:
+            return json.load(handle)
+    except (OSError, ValueError, ImproperlyConfigured):
+        return {}
+
+
+def _srcset(sources, mime_type):
+    return ", ".join(
+        f"{static(source['name'])} {source['width']}w" for source in sources if source["type"] == mime_type
+    )
+
+
+@register.simple_tag
+def responsive_image(name, sizes="100vw", **attrs):
+    """``<picture>`` with WebP and fallback ``srcset``s for a static image.
+
+    ``{% responsive_image 'assetz/img/about.jpg' sizes='50vw' alt='About' class='img' %}``;
+    extra keyword arguments become ``<img>`` attributes. Images collectstatic
+    has not processed render as a plain lazy-loaded ``<img>``.
+    """
+    attrs.setdefault("alt", "")
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    entry = responsive_manifest().get(name)
+    if entry is None:
+        return format_html(
+            "<img src=\"{}\"{}>", static(name),
+            format_html_join("", ' {}="{}"', sorted(attrs.items())),
+        )
+    fallback_type = next(
+        (source["type"] for source in entry["sources"] if source["type"] != "image/webp"), None
+    )
+    fallback = _srcset(entry["sources"], fallback_type) if fallback_type else ""
+    # the untouched original is the largest fallback candidate
+    fallback = ", ".join(filter(None, [fallback, f"{static(name)} {entry['width']}w"]))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(entry["sources"], "image/webp"), sizes,
+        static(name), fallback, sizes,
+        format_html_join("", ' {}="{}"', sorted(attrs.items())),
+    )
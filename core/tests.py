@@ -1,3 +1,996 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from bankingsystem.admin_actions import stream_csv
+from django.shortcuts import render
+from django.template import Context, Template
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import CourierAdmin
+from .facets import facet_counts, rebuild_facets
+from .media_uploads import LocalUploadBackend, UploadWorkerPool, process_upload
+from .models import Courier, CourierEvent, MediaUpload, NewsletterSubscriber
+from .newsletter import ALREADY_ACTIVE, REACTIVATED, SUBSCRIBED, subscribe
+from .storage import RESPONSIVE_MANIFEST, ResponsiveStaticFilesStorage
+from .streams import TrackingFeedHub
+from .thumbnails import LocalThumbnailer, thumbnail_url
+from .timeline import latest_events
+from .tracking_cache import TRACKING_MISSES_KEY, cache_stats, get_courier, reset_cache_stats
+from .tracking_ids import TrackingIdAllocator, check_character, format_tracking_id, is_valid_tracking_id
+
+
+def make_courier(tracking_id, **fields):
+    fields.setdefault("service", "NeoLite-Logistics")
+    fields.setdefault("sender_name", "Sender")
+    fields.setdefault("receiver_name", "Receiver")
+    return Courier.objects.create(tracking_id=tracking_id, **fields)
+
+
+class TrackingCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.courier = make_courier("NEO123")
+
+    def test_default_cache_serves_hits_without_queries(self):
+        self.assertEqual(settings.CACHES["default"]["BACKEND"], "django.core.cache.backends.locmem.LocMemCache")
+        get_courier("NEO123")
+        with self.assertNumQueries(0), mock.patch.object(cache, "incr") as incr:
+            for _ in range(3):
+                get_courier("NEO123")
+        incr.assert_not_called()
+        self.assertEqual(cache_stats()["hits"], 3)
+
+    def test_counts_are_flushed_to_the_cache_periodically(self):
+        with override_settings(TRACKING_STATS_FLUSH_INTERVAL=0):
+            get_courier("NEO123")
+        self.assertEqual(cache.get(TRACKING_MISSES_KEY), 1)
+
+    def test_second_lookup_is_served_from_cache(self):
+        get_courier("NEO123")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_courier("NEO123").pk, self.courier.pk)
+        self.assertEqual(cache_stats()["hits"], 1)
+        self.assertEqual(cache_stats()["misses"], 1)
+
+    def test_unknown_tracking_id_is_cached_as_missing(self):
+        self.assertIsNone(get_courier("NOPE"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_courier("NOPE"))
+        make_courier("NOPE")
+        self.assertIsNotNone(get_courier("NOPE"))
+
+    def test_save_and_delete_invalidate(self):
+        get_courier("NEO123")
+        self.courier.status = "delivered"
+        self.courier.save()
+        self.assertEqual(get_courier("NEO123").status, "delivered")
+
+        self.courier.tracking_id = "NEO999"
+        self.courier.save()
+        self.assertIsNone(get_courier("NEO123"))
+
+        self.courier.delete()
+        self.assertIsNone(get_courier("NEO999"))
+
+    def test_admin_bulk_actions_invalidate(self):
+        get_courier("NEO123")
+        admin = CourierAdmin(Courier, AdminSite())
+        admin._update_shipments(Courier.objects.all(), status="in_transit")
+        self.assertEqual(get_courier("NEO123").status, "in_transit")
+
+
+class CourierTrackingApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_courier("NEO123", current_location="Lagos")
+        self.url = reverse("core:courier_tracking_api", args=["NEO123"])
+
+    def test_returns_json_with_validators(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["current_location"], "Lagos")
+        self.assertTrue(response.has_header("ETag"))
+        self.assertFalse(response["ETag"].startswith("W/"))
+        self.assertTrue(response.has_header("Last-Modified"))
+
+    def test_matching_etag_is_not_modified_from_one_column(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT="application/json")["ETag"]
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries, mock.patch("core.views.get_courier") as get_courier_:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        get_courier_.assert_not_called()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('SELECT "core_courier"."updated_at" FROM', queries[0]["sql"])
+
+    def test_validators_describe_the_body_served(self):
+        first = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        # a write that skips invalidation: the stale cached copy is not served
+        Courier.objects.filter(tracking_id="NEO123").update(
+            current_location="Abuja", updated_at=timezone.now() + timedelta(minutes=1)
+        )
+        second = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(second.json()["current_location"], "Abuja")
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=second["ETag"]).status_code, 304)
+
+    def test_body_changed_after_the_validators_keeps_its_own_etag(self):
+        first = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        updated_at = Courier.objects.get(tracking_id="NEO123").updated_at
+        # the row changes between the validator query and the body load
+        Courier.objects.filter(tracking_id="NEO123").update(
+            current_location="Abuja", updated_at=updated_at + timedelta(minutes=1)
+        )
+        cache.clear()
+        with mock.patch("core.views._tracked_updated_at", return_value=updated_at):
+            second = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(second.json()["current_location"], "Abuja")
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=second["ETag"]).status_code, 304)
+
+    def test_if_modified_since_is_not_modified(self):
+        last_modified = self.client.get(self.url, HTTP_ACCEPT="application/json")["Last-Modified"]
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_bulk_admin_update_changes_etag(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT="application/json")["ETag"]
+        CourierAdmin(Courier, AdminSite())._update_shipments(Courier.objects.all(), status="delivered")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "delivered")
+
+    def test_unknown_tracking_id_is_404(self):
+        url = reverse("core:courier_tracking_api", args=["MISSING"])
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT="application/json").status_code, 404)
+
+
+class CourierBatchTrackingApiTests(TestCase):
+    url = reverse("core:courier_batch_tracking_api")
+
+    def setUp(self):
+        cache.clear()
+        make_courier("NEO1")
+        make_courier("NEO2")
+
+    def test_json_results_keep_input_order(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.url, {"tracking_ids": ["NEO2", "MISSING", "NEO1"]}, content_type="application/json"
+            )
+        results = response.json()["results"]
+        self.assertEqual([r["tracking_id"] for r in results], ["NEO2", "MISSING", "NEO1"])
+        self.assertEqual([r["found"] for r in results], [True, False, True])
+
+    def test_newline_file_upload(self):
+        upload = SimpleUploadedFile("ids.txt", b"NEO1\n\nNEO2\n")
+        response = self.client.post(self.url, {"file": upload})
+        self.assertEqual(response.json()["count"], 2)
+
+    @override_settings(TRACKING_BATCH_MAX_IDS=2)
+    def test_batch_size_is_capped(self):
+        response = self.client.post(
+            self.url, {"tracking_ids": ["A", "B", "C"]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(TRACKING_BATCH_CHUNK_SIZE=1)
+    def test_large_batches_are_chunked(self):
+        with self.assertNumQueries(2):
+            self.client.post(self.url, {"tracking_ids": ["NEO1", "NEO2"]}, content_type="application/json")
+
+
+class CourierTimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.courier = make_courier("NEO123", current_location="Lagos")
+
+    def test_saves_record_only_status_or_location_changes(self):
+        self.courier.remarks = "fragile"
+        self.courier.save()
+        self.courier.current_location = "Accra"
+        self.courier.save()
+        self.assertEqual(
+            list(self.courier.events.values_list("location", flat=True)), ["Accra", "Lagos"]
+        )
+
+    def test_bulk_actions_write_events_in_one_insert(self):
+        other = make_courier("NEO456")
+        admin = CourierAdmin(Courier, AdminSite())
+        admin._update_shipments(Courier.objects.filter(pk__in=[self.courier.pk, other.pk]), status="in_transit")
+        events = CourierEvent.objects.filter(source="bulk_action")
+        self.assertEqual(events.count(), 2)
+        self.assertEqual(events.get(courier=self.courier).location, "Lagos")
+
+    def test_keyset_pages_cover_history_once(self):
+        for n in range(4):
+            self.courier.current_location = f"Hub {n}"
+            self.courier.save()
+        seen, cursor = [], None
+        while True:
+            events, cursor = latest_events(self.courier, limit=2, before=cursor)
+            seen.extend(event.location for event in events)
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["Hub 3", "Hub 2", "Hub 1", "Hub 0", "Lagos"])
+
+
+@override_settings(TRACKING_STREAM_POLL_INTERVAL=0.01)
+class TrackingStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.courier = make_courier("NEO123", current_location="Lagos")
+
+    async def test_subscribers_share_one_feed_and_see_changes(self):
+        hub = TrackingFeedHub()
+        first = hub.subscribe("NEO123")
+        second = hub.subscribe("NEO123")
+        self.assertEqual(len(hub.feeds), 1)
+
+        self.assertEqual((await first.get())["location"], "Lagos")
+        self.assertEqual((await second.get())["location"], "Lagos")
+
+        self.courier.current_location = "Accra"
+        await sync_to_async(self.courier.save)()
+        self.assertEqual((await first.get())["location"], "Accra")
+        self.assertEqual((await second.get())["location"], "Accra")
+
+        hub.unsubscribe("NEO123", first)
+        hub.unsubscribe("NEO123", second)
+        self.assertEqual(hub.feeds, {})
+
+    def test_wsgi_request_gets_single_event(self):
+        response = self.client.get(reverse("core:courier_tracking_stream", args=["NEO123"]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn(b"event: status", response.content)
+
+    def test_unknown_shipment_is_404(self):
+        response = self.client.get(reverse("core:courier_tracking_stream", args=["MISSING"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CourierAdminSearchTests(TestCase):
+    def test_sqlite_falls_back_to_icontains_on_all_fields(self):
+        make_courier("NEO1", remarks="Fragile glassware")
+        make_courier("NEO2", receiver_name="Ada Fragile")
+        make_courier("NEO3")
+        admin = CourierAdmin(Courier, AdminSite())
+        results, _ = admin.get_search_results(RequestFactory().get("/"), Courier.objects.all(), "fragile")
+        self.assertEqual(sorted(results.values_list("tracking_id", flat=True)), ["NEO1", "NEO2"])
+
+    def test_each_word_may_match_a_different_field(self):
+        make_courier("NEO1", remarks="Fragile glassware", receiver_name="Ada")
+        make_courier("NEO2", remarks="Fragile glassware", receiver_name="Bola")
+        admin = CourierAdmin(Courier, AdminSite())
+        results, _ = admin.get_search_results(RequestFactory().get("/"), Courier.objects.all(), "glass ada")
+        self.assertEqual(list(results.values_list("tracking_id", flat=True)), ["NEO1"])
+
+
+class CourierChangelistPaginationTests(TestCase):
+    url = reverse("admin:core_courier_changelist")
+
+    def setUp(self):
+        admin_user = get_user_model().objects.create_superuser("admin@example.com", "pw")
+        self.client.force_login(admin_user)
+        now = timezone.now()
+        # pairs of rows share a date_sent so the created_at/pk tie-breakers are exercised
+        for n in range(60):
+            make_courier(f"NEO{n:03d}", date_sent=now - timedelta(days=n // 2))
+
+    def test_keyset_pages_visit_every_row_once(self):
+        seen, url = [], self.url
+        while url:
+            response = self.client.get(url)
+            cl = response.context["cl"]
+            self.assertTrue(cl.keyset)
+            seen.extend(courier.tracking_id for courier in cl.result_list)
+            url = cl.older_url and self.url + cl.older_url
+        self.assertEqual(len(seen), 60)
+        self.assertEqual(seen, list(Courier.objects.order_by("-date_sent", "-created_at", "-pk")
+                                    .values_list("tracking_id", flat=True)))
+
+    def test_newer_link_returns_previous_page(self):
+        first = self.client.get(self.url).context["cl"]
+        second = self.client.get(self.url + first.older_url).context["cl"]
+        back = self.client.get(self.url + second.newer_url).context["cl"]
+        self.assertEqual(list(back.result_list), list(first.result_list))
+        self.assertIsNone(back.newer_url)
+
+    def test_filtered_changelist_skips_full_count(self):
+        response = self.client.get(self.url, {"status__exact": "processing"})
+        self.assertIsNone(response.context["cl"].full_result_count)
+
+    def test_custom_sort_falls_back_to_numbered_pages(self):
+        response = self.client.get(self.url, {"o": "1"})
+        cl = response.context["cl"]
+        self.assertFalse(cl.keyset)
+        self.assertEqual(len(cl.result_list), 25)
+
+
+class CourierFacetTests(TestCase):
+    def setUp(self):
+        self.may = timezone.make_aware(datetime(2024, 5, 10))
+        self.june = timezone.make_aware(datetime(2024, 6, 3))
+
+    def test_counts_follow_create_save_and_delete(self):
+        first = make_courier("NEO001", date_sent=self.may)
+        make_courier("NEO002", date_sent=self.june, status="in_transit")
+        self.assertEqual(facet_counts("status"), {"processing": 1, "in_transit": 1})
+        self.assertEqual(facet_counts("month"), {"2024-05": 1, "2024-06": 1})
+
+        first.status = "in_transit"
+        first.date_sent = self.june
+        first.save()
+        self.assertEqual(facet_counts("status"), {"in_transit": 2})
+        self.assertEqual(facet_counts("month"), {"2024-06": 2})
+
+        first.delete()
+        self.assertEqual(facet_counts("status"), {"in_transit": 1})
+        self.assertEqual(facet_counts("service"), {"NeoLite-Logistics": 1})
+
+    def test_bulk_action_moves_counts(self):
+        for n in range(3):
+            make_courier(f"NEO{n:03d}", date_sent=self.may)
+        model_admin = CourierAdmin(Courier, AdminSite())
+        model_admin._update_shipments(Courier.objects.filter(tracking_id__in=["NEO000", "NEO001"]), status="delivered")
+        self.assertEqual(facet_counts("status"), {"processing": 1, "delivered": 2})
+
+    def test_rebuild_matches_maintained_counts(self):
+        make_courier("NEO001", date_sent=self.may)
+        make_courier("NEO002", date_sent=self.june, status="delivered")
+        maintained = {kind: facet_counts(kind) for kind in ("status", "service", "month")}
+        rebuild_facets()
+        self.assertEqual({kind: facet_counts(kind) for kind in ("status", "service", "month")}, maintained)
+
+    def test_changelist_hierarchy_and_filters_come_from_facets(self):
+        admin_user = get_user_model().objects.create_superuser("admin@example.com", "pw")
+        self.client.force_login(admin_user)
+        make_courier("NEO001", date_sent=self.may)
+        make_courier("NEO002", date_sent=self.june, status="delivered")
+        make_courier("NEO003", date_sent=self.may + timedelta(days=365))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:core_courier_changelist"))
+        self.assertContains(response, "Delivered (1)")
+        self.assertContains(response, "?date_sent__year=2025")
+        table = Courier._meta.db_table
+        scans = [
+            query["sql"] for query in queries.captured_queries
+            if f'FROM "{table}"' in query["sql"] and ("MIN(" in query["sql"] or "DISTINCT" in query["sql"])
+        ]
+        self.assertEqual(scans, [])
+
+        response = self.client.get(reverse("admin:core_courier_changelist"), {"date_sent__year": "2024"})
+        self.assertContains(response, "?date_sent__month=5&amp;date_sent__year=2024")
+        self.assertContains(response, "?date_sent__month=6&amp;date_sent__year=2024")
+
+
+class ImportCouriersTests(TestCase):
+    header = "tracking_id,service,status,sender_name,receiver_name,quantity,date_sent\n"
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command("import_couriers", path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_validates_rows_and_maintains_derived_data(self):
+        get_courier("NEO001")  # cached as missing before the import
+        path = self.write("batch.csv", self.header + (
+            "NEO001,LWE,in_transit,Ann,Bob,2,2024-05-10 09:00\n"
+            "NEO002,Not A Carrier,,Ann,Bob,1,\n"
+            ",SPC,,Ann,Bob,,\n"
+        ))
+        out, err = self.run_import(path, batch_size=2)
+        self.assertIn("inserted=2 updated=0 skipped=0 invalid=1", out)
+        self.assertIn("row 2: service:", err)
+        self.assertEqual(get_courier("NEO001").quantity, 2)
+        self.assertTrue(timezone.is_aware(Courier.objects.get(tracking_id="NEO001").date_sent))
+        issued = Courier.objects.get(service="SPC")
+        self.assertTrue(issued.tracking_id.startswith("SPC"))
+        self.assertEqual(issued.status, "processing")
+        self.assertEqual(CourierEvent.objects.filter(source="import").count(), 2)
+        self.assertEqual(facet_counts("service"), {"LWE": 1, "SPC": 1})
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+    def test_conflicts_are_skipped_or_updated(self):
+        make_courier("NEO001", current_location="Lagos")
+        path = self.write("batch.jsonl", "\n".join(json.dumps(row) for row in [
+            {"tracking_id": "NEO001", "status": "delivered"},
+            {"tracking_id": "NEO002", "service": "LWE", "sender_name": "Ann", "receiver_name": "Bob"},
+            {"tracking_id": "NEO002", "service": "SPC", "sender_name": "Ann", "receiver_name": "Bob"},
+        ]))
+        out, _ = self.run_import(path)
+        self.assertIn("inserted=1 updated=0 skipped=2", out)
+        self.assertEqual(Courier.objects.get(tracking_id="NEO001").status, "processing")
+
+        out, _ = self.run_import(path, on_conflict="update")
+        self.assertIn("inserted=0 updated=2 skipped=1", out)
+        updated = Courier.objects.get(tracking_id="NEO001")
+        self.assertEqual((updated.status, updated.current_location), ("delivered", "Lagos"))
+        self.assertEqual(facet_counts("status"), {"processing": 1, "delivered": 1})
+
+    def test_resumes_after_checkpoint(self):
+        path = self.write("batch.csv", self.header + "".join(
+            f"NEO{n:03d},LWE,,Ann,Bob,1,\n" for n in range(5)
+        ))
+        self.write("batch.csv.checkpoint", json.dumps({"source": os.path.abspath(path), "rows": 3}))
+        out, _ = self.run_import(path)
+        self.assertIn("Resuming after 3 rows", out)
+        self.assertEqual(
+            list(Courier.objects.order_by("tracking_id").values_list("tracking_id", flat=True)),
+            ["NEO003", "NEO004"],
+        )
+
+
+class CSVExportTests(TestCase):
+    def setUp(self):
+        admin_user = get_user_model().objects.create_superuser("admin@example.com", "pw")
+        self.client.force_login(admin_user)
+        make_courier("NEO001", status="delivered")
+        make_courier("NEO002")
+        make_courier("NEO003")
+
+    def rows(self, response, compressed=False):
+        body = b"".join(response.streaming_content)
+        if compressed:
+            body = gzip.decompress(body)
+        return list(csv.DictReader(body.decode("utf-8").splitlines()))
+
+    def test_action_streams_selected_rows(self):
+        response = self.client.post(reverse("admin:core_courier_changelist"), {
+            "action": "export_as_csv",
+            "_selected_action": list(Courier.objects.filter(tracking_id__in=["NEO001", "NEO002"])
+                                     .values_list("pk", flat=True)),
+        })
+        self.assertTrue(response.streaming)
+        rows = self.rows(response)
+        self.assertEqual(sorted(row["tracking_id"] for row in rows), ["NEO001", "NEO002"])
+        self.assertNotIn("search_vector", rows[0])
+
+    def test_export_view_uses_changelist_filters(self):
+        response = self.client.get(reverse("admin:core_courier_export_csv"), {"status__exact": "processing"})
+        self.assertEqual(sorted(row["tracking_id"] for row in self.rows(response)), ["NEO002", "NEO003"])
+
+        response = self.client.get(reverse("admin:core_courier_export_csv_gz"), {"q": "NEO001"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual([row["tracking_id"] for row in self.rows(response, compressed=True)], ["NEO001"])
+
+    def test_changelist_links_carry_filters(self):
+        response = self.client.get(reverse("admin:core_newslettersubscriber_changelist"), {"is_active__exact": "1"})
+        self.assertContains(response, reverse("admin:core_newslettersubscriber_export_csv") + "?is_active__exact=1")
+
+    def test_rows_are_fetched_in_keyset_chunks(self):
+        with self.assertNumQueries(2):
+            lines = list(stream_csv(Courier.objects.order_by("-tracking_id"), ["tracking_id"], chunk_size=2))
+        self.assertEqual(lines, ["tracking_id\r\n", "NEO001\r\n", "NEO002\r\n", "NEO003\r\n"])
+
+
+class DuplicateShipmentsTests(TestCase):
+    def test_clones_get_unique_ids_and_derived_data(self):
+        for n in range(3):
+            make_courier(f"ORIG{n}", status="delivered", current_location="Lagos")
+        request = RequestFactory().post("/")
+        model_admin = CourierAdmin(Courier, AdminSite())
+        with mock.patch("core.admin.DUPLICATE_CHUNK_SIZE", 2), \
+                mock.patch.object(model_admin, "message_user") as message_user:
+            model_admin.duplicate_shipments(request, Courier.objects.all())
+        self.assertIn("3 shipment(s) duplicated", message_user.call_args[0][1])
+
+        clones = Courier.objects.exclude(tracking_id__startswith="ORIG")
+        self.assertEqual(clones.count(), 3)
+        self.assertTrue(all(is_valid_tracking_id(tracking_id) for tracking_id in clones.values_list("tracking_id", flat=True)))
+        self.assertEqual(set(clones.values_list("status", "current_location")), {("processing", "Lagos")})
+        self.assertEqual(CourierEvent.objects.filter(courier__in=clones, source="bulk_action").count(), 3)
+        self.assertEqual(facet_counts("status"), {"delivered": 3, "processing": 3})
+
+
+class TrackingIdAllocatorTests(TestCase):
+    def test_issued_ids_are_prefixed_unique_and_self_checking(self):
+        ids = TrackingIdAllocator().issue_many(["LWE", "DHL Ecommerce", None] * 100)
+        self.assertEqual(len(set(ids)), 300)
+        self.assertEqual([tracking_id[:3] for tracking_id in ids[:3]], ["LWE", "DHL", "NEO"])
+        self.assertTrue(all(is_valid_tracking_id(tracking_id) for tracking_id in ids))
+
+    def test_check_character_catches_typos(self):
+        tracking_id = format_tracking_id("LWE", 123457)
+        self.assertTrue(is_valid_tracking_id(tracking_id))
+        body = tracking_id[:-1]
+        typo = body[:5] + str((int(body[5]) + 1) % 10) + body[6:] + tracking_id[-1]
+        swapped = body[:-2] + body[-1] + body[-2] + tracking_id[-1]
+        self.assertFalse(is_valid_tracking_id(typo))
+        self.assertFalse(is_valid_tracking_id(swapped))
+        self.assertTrue(is_valid_tracking_id("LEGACY-ID-42"))
+        with self.settings(TRACKING_ID_ACCEPT_LEGACY=False):
+            self.assertFalse(is_valid_tracking_id("LEGACY-ID-42"))
+
+    def test_blocks_outside_transactions_are_reused(self):
+        allocator = TrackingIdAllocator()
+        with mock.patch("bankingsystem.block_allocator.connection.in_atomic_block", False), \
+                mock.patch("core.tracking_ids.reserve_block", side_effect=[1, 1001]) as reserve, \
+                self.settings(TRACKING_ID_BLOCK_SIZE=50):
+            ids = allocator.issue_many([None] * 30) + allocator.issue_many([None] * 30)
+        self.assertEqual(reserve.call_count, 2)
+        self.assertEqual(len(set(ids)), 60)
+
+    def test_malformed_lookup_skips_cache_and_database(self):
+        tracking_id = TrackingIdAllocator().issue("LWE")
+        bad = tracking_id[:-1] + ("0" if tracking_id[-1] != "0" else "1")
+        misses = cache_stats()["misses"]
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_courier(bad))
+        self.assertEqual(cache_stats()["misses"], misses)
+
+    def test_admin_issues_id_for_blank_tracking_id(self):
+        model_admin = CourierAdmin(Courier, AdminSite())
+        request = RequestFactory().post("/")
+        courier = Courier(service="SPC", sender_name="Ann", receiver_name="Bob")
+        with mock.patch.object(model_admin, "message_user"):
+            model_admin.save_model(request, courier, form=None, change=False)
+        self.assertTrue(courier.tracking_id.startswith("SPC"))
+        self.assertEqual(check_character(courier.tracking_id[:-1]), courier.tracking_id[-1])
+
+
+class NewsletterSubscribeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_upsert_reports_each_outcome_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(subscribe("reader@example.com", ip_address="10.0.0.1"), SUBSCRIBED)
+        self.assertEqual(subscribe("reader@example.com"), ALREADY_ACTIVE)
+        NewsletterSubscriber.objects.update(is_active=False)
+        self.assertEqual(subscribe("reader@example.com"), REACTIVATED)
+
+        subscriber = NewsletterSubscriber.objects.get()
+        self.assertTrue(subscriber.is_active)
+        self.assertEqual(subscriber.ip_address, "10.0.0.1")
+        self.assertLess(timezone.now() - subscriber.subscribed_at, timedelta(minutes=1))
+
+    def test_view_responses(self):
+        url = reverse("core:newsletter_subscribe")
+        self.assertEqual(self.client.post(url, {"email": "Reader@Example.com"}).status_code, 200)
+        response = self.client.post(url, {"email": "reader@example.com"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already subscribed", response.json()["message"])
+
+    @override_settings(NEWSLETTER_THROTTLE_LIMIT=2)
+    def test_burst_from_one_ip_is_throttled_before_the_database(self):
+        url = reverse("core:newsletter_subscribe")
+        for n in range(2):
+            self.client.post(url, {"email": f"bot{n}@example.com"}, REMOTE_ADDR="10.0.0.2")
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {"email": "bot2@example.com"}, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.post(url, {"email": "human@example.com"}, REMOTE_ADDR="10.0.0.3").status_code, 200)
+
+    @override_settings(NEWSLETTER_THROTTLE_LIMIT=2, TRUSTED_PROXY_COUNT=1)
+    def test_forged_forwarded_for_does_not_reset_the_throttle(self):
+        url = reverse("core:newsletter_subscribe")
+        for n in range(3):
+            response = self.client.post(
+                url, {"email": f"bot{n}@example.com"},
+                REMOTE_ADDR="100.64.0.1", HTTP_X_FORWARDED_FOR=f"198.51.100.{n}, 203.0.113.7",
+            )
+        self.assertEqual(response.status_code, 429)
+
+
+class SendCampaignTests(TestCase):
+    def setUp(self):
+        for n in range(5):
+            NewsletterSubscriber.objects.create(email=f"reader{n}@example.com", is_active=n != 2)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = os.path.join(tmp.name, "spring.checkpoint")
+
+    def send(self, *args):
+        call_command(
+            "send_campaign", "spring", "--subject", "Spring update", "--batch-size", "2", "--rate", "0",
+            "--checkpoint", self.checkpoint, *args, stdout=StringIO(),
+        )
+
+    def test_sends_to_active_subscribers_over_one_connection(self):
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as open_connection:
+            self.send()
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["reader0@example.com", "reader1@example.com", "reader3@example.com", "reader4@example.com"],
+        )
+        self.assertTrue(all(message.alternatives for message in mail.outbox))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        real_send = mail.get_connection().__class__.send_messages
+        calls = []
+
+        def fail_third_message(backend, messages):
+            calls.append(len(messages))
+            if len(calls) == 3:
+                raise ConnectionError("smtp went away")
+            return real_send(backend, messages)
+
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", fail_third_message):
+            with self.assertRaises(ConnectionError):
+                self.send()
+        with open(self.checkpoint) as handle:
+            self.assertEqual(json.load(handle)["sent"], 2)
+
+        self.send()
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 4)
+
+    def test_messages_are_paced_one_at_a_time(self):
+        clock = [0.0]
+        with mock.patch("core.management.commands.send_campaign.time.monotonic", side_effect=lambda: clock[0]), \
+                mock.patch("core.management.commands.send_campaign.time.sleep",
+                           side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds)) as sleep:
+            call_command(
+                "send_campaign", "spring", "--subject", "Spring update", "--batch-size", "100", "--rate", "2",
+                "--checkpoint", self.checkpoint, stdout=StringIO(),
+            )
+        # four messages at 2/s: every one after the first waits its half second
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 0.5, 0.5])
+
+    def test_each_message_carries_a_working_unsubscribe_link(self):
+        self.send("--site-url", "https://news.example.com/")
+        message = mail.outbox[0]
+        link = message.extra_headers["List-Unsubscribe"].strip("<>")
+        self.assertTrue(link.startswith("https://news.example.com/core/newsletter/unsubscribe/"))
+        self.assertEqual(message.extra_headers["List-Unsubscribe-Post"], "List-Unsubscribe=One-Click")
+        self.assertIn(link, message.body)
+        self.assertIn(link, message.alternatives[0][0])
+        self.assertNotIn(link, mail.outbox[1].body)
+
+        path = link[len("https://news.example.com"):]
+        self.assertEqual(self.client.get(path).status_code, 200)
+        self.assertTrue(NewsletterSubscriber.objects.get(email=message.to[0]).is_active)
+        self.assertEqual(self.client.post(path).status_code, 200)
+        self.assertFalse(NewsletterSubscriber.objects.get(email=message.to[0]).is_active)
+        self.assertEqual(self.client.post(path[:-2] + "x/").status_code, 404)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches["pages"].clear()
+
+    def test_anonymous_home_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.client.get("/")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/").status_code, 200)
+
+    def test_anonymous_home_is_cached_with_a_fresh_csrf_token(self):
+        with mock.patch("core.views.render", wraps=render) as render_view:
+            first = self.client.get("/")
+            second = Client().get("/")
+        self.assertEqual(render_view.call_count, 1)
+        self.assertNotIn("ETag", second)
+        self.assertIn("private", second["Cache-Control"])
+        self.assertNotIn(b"__page_cache_csrf_token__", second.content)
+        self.assertIn(settings.CSRF_COOKIE_NAME, second.cookies)
+
+    def test_csrf_page_is_never_answered_with_not_modified(self):
+        response = self.client.get("/", HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_conditional_get_returns_not_modified(self):
+        with mock.patch("core.views.render", return_value=HttpResponse("<p>About</p>")):
+            etag = self.client.get("/")["ETag"]
+            response = self.client.get("/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_query_strings_bypass_the_cache(self):
+        with mock.patch("core.views.render", wraps=render) as render_view:
+            self.client.get("/?x=1")
+            self.client.get("/?x=2")
+        self.assertEqual(render_view.call_count, 2)
+
+    def test_new_version_renders_again(self):
+        with mock.patch("core.views.render", wraps=render) as render_view:
+            self.client.get("/")
+            with override_settings(PAGE_CACHE_VERSION="next-deploy"):
+                self.client.get("/")
+        self.assertEqual(render_view.call_count, 2)
+
+    def test_signed_in_visitors_bypass_the_cache(self):
+        self.client.get("/")
+        self.client.force_login(get_user_model().objects.create_user("page@example.com", "pw", username="page"))
+        response = self.client.get("/")
+        self.assertNotIn("ETag", response)
+        self.assertTemplateUsed(response, "core/transactions.html")
+
+
+@override_settings(RESPONSIVE_IMAGE_WIDTHS=(120, 480, 1600))
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = FileSystemStorage(location=os.path.join(tmp.name, "src"))
+        self.storage = ResponsiveStaticFilesStorage(location=os.path.join(tmp.name, "out"), base_url="/static/")
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (1000, 500), "navy").save(buffer, "JPEG")
+        self.source.save("img/photo.jpg", ContentFile(buffer.getvalue()))
+
+    def test_collect_writes_hashed_compressed_variants_and_manifest(self):
+        paths = {"img/photo.jpg": (self.source, "img/photo.jpg")}
+        self.storage._save("img/photo.jpg", self.source.open("img/photo.jpg"))
+        processed = [name for name, hashed, done in self.storage.post_process(paths) if done]
+
+        self.assertIn("img/photo.480w.webp", processed)
+        with self.storage.open(RESPONSIVE_MANIFEST) as handle:
+            entry = json.load(handle)["img/photo.jpg"]
+        self.assertEqual(
+            [(source["width"], source["type"]) for source in entry["sources"]],
+            [(120, "image/webp"), (120, "image/jpeg"), (480, "image/webp"), (480, "image/jpeg"), (1000, "image/webp")],
+        )
+        hashed = self.storage.stored_name("img/photo.120w.webp")
+        self.assertNotEqual(hashed, "img/photo.120w.webp")
+        self.assertTrue(self.storage.exists(hashed))
+        self.assertTrue(self.storage.exists(self.storage.stored_name("img/photo.jpg")))
+
+    def test_tag_emits_webp_and_fallback_srcsets(self):
+        manifest = {"img/photo.jpg": {"width": 1000, "height": 500, "sources": [
+            {"name": "img/photo.480w.webp", "width": 480, "type": "image/webp"},
+            {"name": "img/photo.480w.jpg", "width": 480, "type": "image/jpeg"},
+            {"name": "img/photo.1000w.webp", "width": 1000, "type": "image/webp"},
+        ]}}
+        template = Template("{% load responsive_images %}{% responsive_image 'img/photo.jpg' sizes='50vw' alt='Photo' %}")
+        with mock.patch("core.templatetags.responsive_images.responsive_manifest", return_value=manifest):
+            html = template.render(Context())
+        self.assertIn('srcset="/static/img/photo.480w.webp 480w, /static/img/photo.1000w.webp 1000w"', html)
+        self.assertIn('srcset="/static/img/photo.480w.jpg 480w, /static/img/photo.jpg 1000w"', html)
+        self.assertIn('alt="Photo"', html)
+
+    def test_missing_url_is_tolerated_only_in_vendored_css(self):
+        css = b'.play { background: url("owl.video.play.png"); }'
+        for name in ("css/owl.css", "css/site.css"):
+            self.source.save(name, ContentFile(css))
+            self.storage._save(name, self.source.open(name))
+        paths = {name: (self.source, name) for name in ("css/owl.css", "css/site.css")}
+        errors = [name for name, hashed, done in self.storage.post_process(paths) if isinstance(done, Exception)]
+        self.assertEqual(errors, ["css/site.css"])
+        with self.storage.open(self.storage.stored_name("css/owl.css")) as handle:
+            self.assertEqual(handle.read(), css)
+
+    def test_uncollected_image_renders_plain_img(self):
+        html = Template("{% load responsive_images %}{% responsive_image 'img/missing.jpg' %}").render(Context())
+        self.assertEqual(html, '<img src="/static/img/missing.jpg" alt="" decoding="async" loading="lazy">')
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.local_root = tmp.name
+
+    def test_cloudinary_variants_are_transformation_urls(self):
+        courier = make_courier("THUMB-1", package_image="image/upload/v1690000000/pkgs/box.jpg")
+        courier.refresh_from_db()
+        with mock.patch.object(cache, "get") as cache_get:
+            url = thumbnail_url(courier, "package_image", "preview")
+        cache_get.assert_not_called()
+        self.assertIn("/image/upload/c_limit,f_auto,h_200,q_auto,w_300/v1690000000/pkgs/box.jpg", url)
+        self.assertTrue(url.startswith("https://"))
+        # the field default is a full delivery URL
+        self.assertEqual(
+            thumbnail_url(courier, "id_document", "list"),
+            "https://res.cloudinary.com/demo/image/upload/c_fill,f_auto,h_64,q_auto,w_64/sample.jpg",
+        )
+
+    def test_local_stand_in_resizes_once_per_updated_at(self):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (800, 600), "orange").save(buffer, "JPEG")
+        with open(os.path.join(self.local_root, "box.jpg"), "wb") as handle:
+            handle.write(buffer.getvalue())
+        courier = make_courier("THUMB-2", package_image="box.jpg")
+        courier.refresh_from_db()
+
+        with override_settings(
+            THUMBNAIL_BACKEND="core.thumbnails.LocalThumbnailer",
+            THUMBNAIL_LOCAL_ROOT=self.local_root,
+            THUMBNAIL_LOCAL_URL="/thumbs/",
+        ):
+            url = thumbnail_url(courier, "package_image", "list")
+            with mock.patch.object(LocalThumbnailer, "url") as resize:
+                self.assertEqual(thumbnail_url(courier, "package_image", "list"), url)
+            resize.assert_not_called()
+            with Image.open(os.path.join(self.local_root, url[len("/thumbs/"):])) as thumbnail:
+                self.assertEqual(thumbnail.size, (64, 64))
+
+            Courier.objects.filter(pk=courier.pk).update(updated_at=courier.updated_at + timedelta(minutes=1))
+            courier.refresh_from_db()
+            with mock.patch.object(LocalThumbnailer, "url", return_value=url) as resize:
+                thumbnail_url(courier, "package_image", "list")
+            resize.assert_called_once()
+
+    @override_settings(COURIER_ADMIN_THUMBNAILS=True)
+    def test_changelist_thumbnail_column_is_lazy(self):
+        make_courier("THUMB-3", package_image="image/upload/v1690000000/pkgs/box.jpg")
+        self.client.force_login(get_user_model().objects.create_superuser("thumbs@example.com", "pw"))
+        url = reverse("admin:core_courier_changelist")
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url)
+        self.assertContains(response, "c_fill,f_auto,h_64,q_auto,w_64/v1690000000/pkgs/box.jpg")
+        self.assertContains(response, 'loading="lazy"')
+
+        for number in range(4, 8):
+            make_courier(f"THUMB-{number}", package_image="image/upload/v1690000000/pkgs/box.jpg")
+        with CaptureQueriesContext(connection) as five_rows:
+            self.client.get(url)
+        self.assertEqual(len(five_rows), len(one_row))
+
+
+class MediaUploadTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.local_root = os.path.join(tmp.name, "local")
+        settings_override = override_settings(
+            MEDIA_UPLOAD_ASYNC=True,
+            MEDIA_UPLOAD_BACKEND="core.media_uploads.LocalUploadBackend",
+            MEDIA_UPLOAD_LOCAL_ROOT=self.local_root,
+            MEDIA_UPLOAD_MAX_ATTEMPTS=3,
+            MEDIA_UPLOAD_RETRY_DELAY=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.pool = UploadWorkerPool(autostart=False)
+        pool_patch = mock.patch("core.media_uploads.pool", self.pool)
+        pool_patch.start()
+        self.addCleanup(pool_patch.stop)
+
+    def admin_save(self, courier, **files):
+        for name, content in files.items():
+            setattr(courier, name, SimpleUploadedFile(f"{name}.jpg", content, content_type="image/jpeg"))
+        request = RequestFactory().post("/admin/core/courier/add/")
+        model_admin = CourierAdmin(Courier, AdminSite())
+        with mock.patch.object(model_admin, "message_user"), \
+                mock.patch("cloudinary.uploader.upload_resource") as upload_resource, \
+                self.captureOnCommitCallbacks(execute=True):
+            model_admin.save_model(request, courier, None, courier.pk is not None)
+        upload_resource.assert_not_called()
+        return courier
+
+    def stored_bytes(self, resource):
+        with open(os.path.join(self.local_root, f"{resource.public_id}.{resource.format}"), "rb") as handle:
+            return handle.read()
+
+    def test_admin_save_is_acknowledged_before_the_upload(self):
+        courier = self.admin_save(
+            Courier(tracking_id="UPL-1", service="NeoLite-Logistics", sender_name="S", receiver_name="R"),
+            package_image=b"package-bytes",
+        )
+        courier.refresh_from_db()
+        self.assertEqual(courier.package_image.public_id, "https://res.cloudinary.com/demo/image/upload/sample")
+        upload = MediaUpload.objects.get()
+        self.assertEqual((upload.status, upload.field_name), (MediaUpload.PENDING, "package_image"))
+        self.assertEqual(bytes(upload.data), b"package-bytes")
+        saved_at = courier.updated_at
+
+        self.assertEqual(self.pool.flush(), 1)
+        courier.refresh_from_db()
+        self.assertTrue(courier.package_image.public_id.startswith("uploads/"))
+        self.assertEqual(courier.package_image.format, "jpg")
+        self.assertEqual(self.stored_bytes(courier.package_image), b"package-bytes")
+        self.assertGreater(courier.updated_at, saved_at)
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), (MediaUpload.DONE, 1))
+        self.assertEqual(bytes(upload.data), b"")
+
+    def test_failed_attempts_are_retried_then_kept_for_the_command(self):
+        courier = self.admin_save(make_courier("UPL-2"), id_document=b"id-bytes")
+        with mock.patch(
+            "core.media_uploads.LocalUploadBackend.upload", side_effect=[OSError("timeout"), "uploads/doc.jpg"]
+        ), self.assertLogs("core.media_uploads", "WARNING"):
+            self.pool.flush()
+        upload = MediaUpload.objects.get()
+        self.assertEqual((upload.status, upload.attempts), (MediaUpload.DONE, 2))
+        courier.refresh_from_db()
+        self.assertEqual((courier.id_document.public_id, courier.id_document.format), ("uploads/doc", "jpg"))
+
+        self.admin_save(courier, id_document=b"id-bytes-2")
+        with mock.patch("core.media_uploads.LocalUploadBackend.upload", side_effect=OSError("down")), \
+                self.assertLogs("core.media_uploads", "WARNING"):
+            self.pool.flush()
+        failed = MediaUpload.objects.get(status=MediaUpload.FAILED)
+        self.assertEqual((failed.attempts, failed.last_error), (3, "OSError: down"))
+        self.assertEqual(bytes(failed.data), b"id-bytes-2")
+
+        call_command("retry_media_uploads", "--failed", stdout=StringIO())
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, MediaUpload.DONE)
+        courier.refresh_from_db()
+        self.assertEqual(self.stored_bytes(courier.id_document), b"id-bytes-2")
+
+    def test_newer_upload_discards_a_pending_one(self):
+        courier = self.admin_save(make_courier("UPL-3"), package_image=b"first")
+        self.admin_save(courier, package_image=b"second")
+        self.pool.flush()
+        self.assertEqual(
+            list(MediaUpload.objects.values_list("status", flat=True)), [MediaUpload.DISCARDED, MediaUpload.DONE]
+        )
+        courier.refresh_from_db()
+        self.assertEqual(self.stored_bytes(courier.package_image), b"second")
+        self.assertEqual({bytes(data) for data in MediaUpload.objects.values_list("data", flat=True)}, {b""})
+
+    def test_an_upload_is_pushed_by_only_one_worker(self):
+        self.admin_save(make_courier("UPL-4"), package_image=b"once")
+        upload = MediaUpload.objects.get()
+        with mock.patch("core.media_uploads.LocalUploadBackend.upload", return_value="uploads/once.jpg") as upload_file:
+            self.assertTrue(process_upload(upload.pk))
+            self.assertFalse(process_upload(upload.pk))
+            self.assertEqual(self.pool.flush(), 1)
+        upload_file.assert_called_once()
+
+    def test_upload_discarded_in_flight_does_not_overwrite_the_newer_one(self):
+        courier = self.admin_save(make_courier("UPL-5"), package_image=b"first")
+        first = MediaUpload.objects.get()
+        self.pool._queue.get_nowait()
+        upload = LocalUploadBackend.upload
+
+        def newer_upload_arrives(backend, content, field, instance):
+            # the newer save lands while the first file is on its way up
+            self.admin_save(courier, package_image=b"second")
+            return upload(backend, content, field, instance)
+
+        with mock.patch.object(LocalUploadBackend, "upload", autospec=True, side_effect=newer_upload_arrives) as sent, \
+                self.assertNoLogs("core.media_uploads", "WARNING"):
+            self.assertFalse(process_upload(first.pk))
+        sent.assert_called_once()
+        first.refresh_from_db()
+        self.assertEqual(first.status, MediaUpload.DISCARDED)
+        courier.refresh_from_db()
+        self.assertEqual(courier.package_image.public_id, "https://res.cloudinary.com/demo/image/upload/sample")
+
+        self.assertEqual(self.pool.flush(), 1)
+        courier.refresh_from_db()
+        self.assertEqual(self.stored_bytes(courier.package_image), b"second")
+
+    def test_command_releases_uploads_left_uploading_by_a_dead_worker(self):
+        self.admin_save(make_courier("UPL-6"), package_image=b"orphan")
+        MediaUpload.objects.update(
+            status=MediaUpload.UPLOADING, started_at=timezone.now() - timedelta(hours=1),
+        )
+        out = StringIO()
+        call_command("retry_media_uploads", stdout=out)
+        self.assertIn("Released 1 stale uploads", out.getvalue())
+        self.assertEqual(MediaUpload.objects.get().status, MediaUpload.DONE)
@@ -0,0 +1,32 @@
+from bankingsystem.keyset import newest_first_page
+
+from .models import CourierEvent
+
+
+TIMELINE_PAGE_SIZE = 10
+
+
+def latest_events(courier, limit=TIMELINE_PAGE_SIZE, before=None):
+    """Return ``(events, next_cursor)`` for one page of a shipment's history.
+
+    Pages are newest first and use the (courier, timestamp, id) index as a
+    keyset, so reading any page costs O(limit) however long the history is.
+    """
+    return newest_first_page(CourierEvent.objects.filter(courier=courier), before, limit)
+
+
+def record_bulk_events(rows, source, timestamp):
+    """Append one event per ``(courier_id, status, location)`` row with a single insert."""
+    CourierEvent.objects.bulk_create(
+        [
+            CourierEvent(
+                courier_id=courier_id,
+                status=status,
+                location=location or "",
+                timestamp=timestamp,
+                source=source,
+            )
+            for courier_id, status, location in rows
+        ],
+        batch_size=500,
+    )
@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Courier
+from .tracking_ids import is_valid_tracking_id
+
+
+TRACKING_CACHE_PREFIX = "tracking:courier:"
+TRACKING_HITS_KEY = "tracking:stats:hits"
+TRACKING_MISSES_KEY = "tracking:stats:misses"
+
+# Stored for tracking IDs that do not exist, so repeated bad lookups stay off the DB.
+_NOT_FOUND = "__not_found__"
+
+
+def _cache_key(tracking_id):
+    """Build the cache key for a tracking ID (hashed, so any user input is a valid key)."""
+    digest = hashlib.md5(tracking_id.encode("utf-8")).hexdigest()
+    return f"{TRACKING_CACHE_PREFIX}{digest}"
+
+
+def _incr(key, delta=1):
+    if not delta:
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # The counter was evicted between add() and incr(); start it again.
+        cache.set(key, delta, timeout=None)
+
+
+class _LookupCounter:
+    """Hit/miss tallies kept in process memory.
+
+    Lookups only bump these; the totals are added to the cache counters at
+    most every ``TRACKING_STATS_FLUSH_INTERVAL`` seconds, so a lookup costs
+    no extra cache round trips.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {TRACKING_HITS_KEY: 0, TRACKING_MISSES_KEY: 0}
+        self._flushed_at = time.monotonic()
+
+    def count(self, hits=0, misses=0):
+        with self._lock:
+            self._pending[TRACKING_HITS_KEY] += hits
+            self._pending[TRACKING_MISSES_KEY] += misses
+            due = time.monotonic() - self._flushed_at >= getattr(settings, "TRACKING_STATS_FLUSH_INTERVAL", 60)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {TRACKING_HITS_KEY: 0, TRACKING_MISSES_KEY: 0}
+            self._flushed_at = time.monotonic()
+        for key, delta in pending.items():
+            _incr(key, delta)
+
+    def clear(self):
+        with self._lock:
+            self._pending = {TRACKING_HITS_KEY: 0, TRACKING_MISSES_KEY: 0}
+
+
+counter = _LookupCounter()
+
+
+def _timeout():
+    return getattr(settings, "TRACKING_CACHE_TIMEOUT", 300)
+
+
+def get_courier(tracking_id):
+    """Return the Courier for ``tracking_id`` or None, reading through the cache."""
+    if not is_valid_tracking_id(tracking_id):
+        # malformed (e.g. a bad check character): cannot exist, skip cache and DB
+        return None
+    key = _cache_key(tracking_id)
+    cached = cache.get(key)
+    if cached is not None:
+        counter.count(hits=1)
+        return None if cached == _NOT_FOUND else cached
+
+    counter.count(misses=1)
+    courier = Courier.objects.filter(tracking_id=tracking_id).first()
+    cache.set(key, courier if courier is not None else _NOT_FOUND, timeout=_timeout())
+    return courier
+
+
+def get_couriers(tracking_ids, chunk_size=None):
+    """Resolve many tracking IDs at once.
+
+    Cached records come from one ``get_many``; the rest are fetched with
+    ``tracking_id IN (...)`` queries of at most ``chunk_size`` IDs each.
+    Malformed IDs resolve to None without a lookup. Returns a dict mapping
+    every requested tracking ID to a Courier or None.
+    """
+    chunk_size = chunk_size or getattr(settings, "TRACKING_BATCH_CHUNK_SIZE", 500)
+    found = {}
+    keys = {}
+    for tracking_id in dict.fromkeys(tracking_ids):
+        if is_valid_tracking_id(tracking_id):
+            keys[_cache_key(tracking_id)] = tracking_id
+        else:
+            found[tracking_id] = None
+    cached = cache.get_many(list(keys))
+
+    missing = []
+    for key, tracking_id in keys.items():
+        if key in cached:
+            found[tracking_id] = None if cached[key] == _NOT_FOUND else cached[key]
+        else:
+            missing.append(tracking_id)
+    counter.count(hits=len(found), misses=len(missing))
+
+    fetched = {}
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        for courier in Courier.objects.filter(tracking_id__in=chunk).order_by():
+            fetched[courier.tracking_id] = courier
+
+    to_cache = {}
+    for tracking_id in missing:
+        courier = fetched.get(tracking_id)
+        found[tracking_id] = courier
+        to_cache[_cache_key(tracking_id)] = courier if courier is not None else _NOT_FOUND
+    if to_cache:
+        cache.set_many(to_cache, timeout=_timeout())
+    return found
+
+
+def invalidate_tracking_ids(tracking_ids):
+    """Drop cached records for the given tracking IDs."""
+    keys = [_cache_key(tracking_id) for tracking_id in tracking_ids if tracking_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def cache_stats():
+    """Return the hit/miss counters and the resulting hit ratio.
+
+    Includes this process's unflushed counts. Other processes' counts are
+    only visible once flushed, and only when the cache is shared (Redis).
+    """
+    counter.flush()
+    hits = cache.get(TRACKING_HITS_KEY, 0)
+    misses = cache.get(TRACKING_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    counter.clear()
+    cache.delete_many([TRACKING_HITS_KEY, TRACKING_MISSES_KEY])
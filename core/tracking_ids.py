@@ -0,0 +1,108 @@
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from bankingsystem.block_allocator import BlockAllocator
+
+from .models import Courier, TrackingIdSequence
+
+
+# Three-letter prefix per carrier; unknown services fall back to DEFAULT_PREFIX.
+CARRIER_PREFIXES = {
+    "NeoLite-Logistics": "NEO",
+    "Comone Express": "CME",
+    "Direct Freight Express": "DFE",
+    "Dex-i Express": "DEX",
+    "UPS Express": "UPS",
+    "ZeptoExpress": "ZEP",
+    "Pgeon Delivery": "PGN",
+    "Roadbull": "RDB",
+    "LWE": "LWE",
+    "SPC": "SPC",
+    "DHL Ecommerce": "DHL",
+}
+DEFAULT_PREFIX = "NEO"
+_KNOWN_PREFIXES = set(CARRIER_PREFIXES.values())
+SEQUENCE_DIGITS = 9
+
+# Issued format: prefix, zero-padded sequence number, Luhn mod 36 check character.
+TRACKING_ID_RE = re.compile(r"^([A-Z]{3})(\d{%d})([0-9A-Z])$" % SEQUENCE_DIGITS)
+
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_MAX_LENGTH = Courier._meta.get_field("tracking_id").max_length
+
+
+def check_character(body):
+    """Luhn mod 36 check character for ``body`` (digits and upper-case letters).
+
+    It catches every single-character typo and most swaps of neighbours.
+    """
+    total = 0
+    factor = 2
+    for char in reversed(body):
+        addend = factor * _ALPHABET.index(char)
+        total += addend // 36 + addend % 36
+        factor = 3 - factor
+    return _ALPHABET[-total % 36]
+
+
+def format_tracking_id(prefix, number):
+    if number >= 10 ** SEQUENCE_DIGITS:
+        raise ValueError("Tracking ID sequence exhausted; widen SEQUENCE_DIGITS.")
+    body = f"{prefix}{number:0{SEQUENCE_DIGITS}d}"
+    return body + check_character(body)
+
+
+def is_valid_tracking_id(tracking_id):
+    """Whether ``tracking_id`` could belong to a shipment, judged without a query.
+
+    IDs in the issued format must carry a matching check character. Other
+    IDs (hand-typed or from before the allocator) are accepted only while
+    ``TRACKING_ID_ACCEPT_LEGACY`` is on.
+    """
+    if not tracking_id or len(tracking_id) > _MAX_LENGTH:
+        return False
+    match = TRACKING_ID_RE.match(tracking_id)
+    if match and match.group(1) in _KNOWN_PREFIXES:
+        return check_character(tracking_id[:-1]) == tracking_id[-1]
+    return getattr(settings, "TRACKING_ID_ACCEPT_LEGACY", True)
+
+
+def reserve_block(size, name="courier"):
+    """Reserve ``size`` sequence numbers; returns the first one.
+
+    The row lock keeps concurrent reservations from overlapping, and each
+    call is a single short transaction however many IDs it covers.
+    """
+    with transaction.atomic():
+        sequence, _ = TrackingIdSequence.objects.select_for_update().get_or_create(name=name)
+        start = sequence.next_value
+        sequence.next_value = start + size
+        sequence.save(update_fields=["next_value"])
+    return start
+
+
+class TrackingIdAllocator(BlockAllocator):
+    """Hands out tracking IDs from a block of sequence numbers reserved by this process."""
+
+    block_size_setting = "TRACKING_ID_BLOCK_SIZE"
+    default_block_size = 1000
+
+    def reserve(self, size):
+        return reserve_block(size)
+
+    def issue(self, service=None):
+        """Return one new tracking ID for a shipment with ``service``."""
+        return self.issue_many([service])[0]
+
+    def issue_many(self, services):
+        """Return one new tracking ID per service in ``services``, in order."""
+        services = list(services)
+        return [
+            format_tracking_id(CARRIER_PREFIXES.get(service, DEFAULT_PREFIX), number)
+            for service, number in zip(services, self.take(len(services)))
+        ]
+
+
+allocator = TrackingIdAllocator()
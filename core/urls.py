@@ -11,6 +11,10 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('core/', views.search_courier, name='search_courier'),
     path('subscribe-newsletter/', views.subscribe_newsletter, name='newsletter_subscribe'),
+    path('newsletter/unsubscribe/<str:token>/', views.newsletter_unsubscribe, name='newsletter_unsubscribe'),
     path('logpage/', views.logpage, name='logpage'),
+    path('api/track/batch/', views.courier_batch_tracking_api, name='courier_batch_tracking_api'),
+    path('api/track/<str:tracking_id>/', views.courier_tracking_api, name='courier_tracking_api'),
+    path('api/track/<str:tracking_id>/stream/', views.courier_tracking_stream, name='courier_tracking_stream'),
     # ... your other paths
 ]
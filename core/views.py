@@ -9,9 +9,10 @@ from accounts.models import User
 from django.core.paginator import Paginator
 from core.models import *
 from .forms import *
+from .page_cache import cache_public_page
 
+@cache_public_page
 def home(request):
-    users = User.objects.all()
     if not request.user.is_authenticated:
         return render(request, "core/index.html", {})
     else:
@@ -25,7 +26,8 @@ def home(request):
             tracking_id = form.cleaned_data['tracking_id']
 
             # Perform the search based on the tracking_id
-            couriers = Courier.objects.filter(tracking_id=tracking_id)
+            courier = get_courier(tracking_id)
+            couriers = [courier] if courier else []
 
         context = {
             "user": user,
@@ -39,6 +41,7 @@ def home(request):
 
 
     
+@cache_public_page
 def logpage(request):
     return render(request, "core/logpage.html", {})  
 
@@ -47,6 +50,8 @@ from django.utils import timezone
 from django.views.decorators.cache import cache_control
 from .models import Courier
 from .forms import SearchCourierForm
+from .timeline import latest_events
+from .tracking_cache import get_courier, invalidate_tracking_ids
 
 @cache_control(no_cache=True, must_revalidate=True, no_store=True)
 def search_courier(request):
@@ -56,11 +61,10 @@ def search_courier(request):
 
     if form.is_valid():
         tracking_id = form.cleaned_data['tracking_id']
-        couriers = Courier.objects.filter(tracking_id=tracking_id)
+        courier = get_courier(tracking_id)
+        couriers = [courier] if courier else []
         
-        if couriers.exists():
-            courier = couriers.first()
-            
+        if courier:
             # Build the complete URL and ensure HTTPS
             domain = request.get_host()
             if not request.is_secure():
@@ -77,6 +81,14 @@ def search_courier(request):
                 'updated_time': timezone.now().isoformat(),
                 'domain': domain
             })
+
+            events, events_next_cursor = latest_events(
+                courier, before=request.GET.get('events_before')
+            )
+            context.update({
+                'events': events,
+                'events_next_cursor': events_next_cursor,
+            })
     
     context['couriers'] = couriers
     return render(request, 'core/index.html', context)
@@ -85,27 +97,27 @@ def search_courier(request):
 # ============================================
 # views.py
 # ============================================
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from .models import NewsletterSubscriber
+from bankingsystem.client_ip import get_client_ip
 
-
-def get_client_ip(request):
-    """Extract client IP address from request."""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+from .newsletter import ALREADY_ACTIVE, REACTIVATED, allow_attempt, subscribe, subscriber_from_token, unsubscribe
 
 
 @require_http_methods(["POST"])
 def subscribe_newsletter(request):
     """Handle newsletter subscription."""
+    # checked before anything else, so a burst from one client never reaches the database
+    if not allow_attempt(get_client_ip(request)):
+        return JsonResponse({
+            'success': False,
+            'message': 'Too many attempts. Please try again later.'
+        }, status=429)
+
     try:
         email = request.POST.get('email', '').strip().lower()
         
@@ -125,31 +137,19 @@ def subscribe_newsletter(request):
                 'message': 'Please enter a valid email address.'
             }, status=400)
         
-        # Check if already subscribed
-        existing = NewsletterSubscriber.objects.filter(email=email).first()
-        
-        if existing:
-            if existing.is_active:
-                return JsonResponse({
-                    'success': False,
-                    'message': 'This email is already subscribed to our newsletter!'
-                }, status=400)
-            else:
-                # Reactivate inactive subscriber
-                existing.is_active = True
-                existing.save()
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Welcome back! Your subscription has been reactivated.'
-                })
-        
-        # Create new subscriber
-        ip_address = get_client_ip(request)
-        NewsletterSubscriber.objects.create(
-            email=email,
-            ip_address=ip_address
-        )
-        
+        # One INSERT ... ON CONFLICT: no read-then-write race on the unique email
+        outcome = subscribe(email, ip_address=get_client_ip(request))
+
+        if outcome == ALREADY_ACTIVE:
+            return JsonResponse({
+                'success': False,
+                'message': 'This email is already subscribed to our newsletter!'
+            }, status=400)
+        if outcome == REACTIVATED:
+            return JsonResponse({
+                'success': True,
+                'message': 'Welcome back! Your subscription has been reactivated.'
+            })
         return JsonResponse({
             'success': True,
             'message': 'Thank you for subscribing! Check your inbox for exclusive updates.'
@@ -162,14 +162,233 @@ def subscribe_newsletter(request):
         }, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def newsletter_unsubscribe(request, token):
+    """Unsubscribe link from campaign emails.
+
+    GET only asks for confirmation, so link scanners cannot unsubscribe
+    anyone; POST (the confirm button, or a mail client's one-click
+    ``List-Unsubscribe-Post`` request) deactivates the subscription. The
+    signed token is the credential, hence no CSRF check.
+    """
+    subscriber_id = subscriber_from_token(token)
+    if subscriber_id is None:
+        raise Http404("Invalid unsubscribe link.")
+    if request.method == "POST":
+        unsubscribe(subscriber_id)
+    return render(request, "core/newsletter_unsubscribe.html", {
+        "unsubscribed": request.method == "POST",
+    })
 
+
+
+@cache_public_page
 def about(request):
     return render(request, "core/about.html", {})  
 
+@cache_public_page
 def service(request):
     return render(request, "core/service.html", {})
 
+@cache_public_page
 def contact_us(request):
     return render(request, "core/contact_us.html", {})
 
 
+# ============================================
+# JSON tracking API
+# ============================================
+import hashlib
+
+from django.http import Http404
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .serializers import CourierTrackingSerializer
+from .tracking_ids import is_valid_tracking_id
+
+
+def _tracked_updated_at(request, tracking_id):
+    """The shipment's ``updated_at`` alone, once per request; None if it does not exist.
+
+    One indexed single-column query, so answering a 304 never loads or
+    caches the whole shipment.
+    """
+    if not hasattr(request, '_tracked_updated_at'):
+        request._tracked_updated_at = (
+            Courier.objects.filter(tracking_id=tracking_id).values_list('updated_at', flat=True).first()
+            if is_valid_tracking_id(tracking_id) else None
+        )
+    return request._tracked_updated_at
+
+
+def _etag(tracking_id, updated_at):
+    return hashlib.sha1(f"{tracking_id}:{updated_at.isoformat()}".encode('utf-8')).hexdigest()
+
+
+def courier_etag(request, tracking_id):
+    updated_at = _tracked_updated_at(request, tracking_id)
+    return _etag(tracking_id, updated_at) if updated_at is not None else None
+
+
+def courier_last_modified(request, tracking_id):
+    return _tracked_updated_at(request, tracking_id)
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=courier_etag, last_modified_func=courier_last_modified)
+@api_view(['GET'])
+def courier_tracking_api(request, tracking_id):
+    """Read-only JSON for one shipment; unchanged shipments get a 304.
+
+    The full shipment is only loaded for a 200. Its validators are set from
+    the object actually serialized (``condition()`` keeps headers the view
+    set), so a body is never stored under an ETag for another version.
+    """
+    courier = get_courier(tracking_id)
+    if courier is None or courier.updated_at != _tracked_updated_at(request, tracking_id):
+        # the cached copy is older than the row the validators just read
+        invalidate_tracking_ids([tracking_id])
+        courier = get_courier(tracking_id)
+    if courier is None:
+        raise Http404("Shipment not found.")
+    response = Response(CourierTrackingSerializer(courier).data)
+    response['ETag'] = quote_etag(_etag(tracking_id, courier.updated_at))
+    response['Last-Modified'] = http_date(courier.updated_at.timestamp())
+    return response
+
+
+# ============================================
+# Batch tracking API
+# ============================================
+from django.conf import settings
+from rest_framework import status
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.decorators import parser_classes
+
+from .tracking_cache import get_couriers
+
+
+def _batch_tracking_ids(request, limit):
+    """Read tracking IDs from a JSON body or an uploaded newline-separated file.
+
+    Reads at most ``limit + 1`` IDs so an oversized upload is never fully loaded.
+    """
+    upload = request.FILES.get('file')
+    if upload is not None:
+        tracking_ids = []
+        for line in upload:
+            tracking_id = line.decode('utf-8', errors='replace').strip()
+            if tracking_id:
+                tracking_ids.append(tracking_id)
+                if len(tracking_ids) > limit:
+                    break
+        return tracking_ids
+
+    data = request.data
+    if isinstance(data, dict):
+        data = data.get('tracking_ids')
+    if not isinstance(data, list):
+        raise ValueError('Send a JSON list of tracking IDs or upload a file.')
+    return [str(tracking_id).strip() for tracking_id in data if str(tracking_id).strip()]
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, MultiPartParser])
+def courier_batch_tracking_api(request):
+    """Track many shipments at once; results keep the input order."""
+    limit = settings.TRACKING_BATCH_MAX_IDS
+    try:
+        tracking_ids = _batch_tracking_ids(request, limit)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not tracking_ids:
+        return Response({'detail': 'No tracking IDs given.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(tracking_ids) > limit:
+        return Response(
+            {'detail': f'At most {limit} tracking IDs can be tracked per request.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    couriers = get_couriers(tracking_ids)
+    results = []
+    for tracking_id in tracking_ids:
+        courier = couriers[tracking_id]
+        if courier is None:
+            results.append({'tracking_id': tracking_id, 'found': False})
+        else:
+            results.append({
+                'tracking_id': tracking_id,
+                'found': True,
+                'shipment': CourierTrackingSerializer(courier).data,
+            })
+    return Response({'count': len(results), 'results': results})
+
+
+# ============================================
+# Live tracking stream (Server-Sent Events)
+# ============================================
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+
+from .streams import fetch_tracking_state, hub
+
+
+def _sse(state, retry_ms):
+    if state is None:
+        return f"retry: {retry_ms}\nevent: gone\ndata: {{}}\n\n"
+    return f"retry: {retry_ms}\nevent: status\ndata: {json.dumps(state)}\n\n"
+
+
+async def _tracking_event_stream(tracking_id):
+    heartbeat = settings.TRACKING_STREAM_HEARTBEAT
+    retry_ms = settings.TRACKING_STREAM_RETRY_MS
+    # Ends on its own so a connection whose client vanished cannot be held forever;
+    # EventSource reconnects transparently.
+    deadline = time.monotonic() + settings.TRACKING_STREAM_MAX_SECONDS
+    queue = hub.subscribe(tracking_id)
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                state = await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(state, retry_ms)
+            if state is None:
+                break
+    finally:
+        hub.unsubscribe(tracking_id, queue)
+
+
+async def courier_tracking_stream(request, tracking_id):
+    """Push status/location changes for one shipment as Server-Sent Events."""
+    state = await sync_to_async(fetch_tracking_state)(tracking_id)
+    if state is None:
+        raise Http404("Shipment not found.")
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker cannot hold the stream open; send the current state and let
+        # EventSource reconnect after the retry delay instead.
+        response = HttpResponse(
+            _sse(state, settings.TRACKING_STREAM_RETRY_MS), content_type='text/event-stream'
+        )
+    else:
+        response = StreamingHttpResponse(
+            _tracking_event_stream(tracking_id), content_type='text/event-stream'
+        )
+        response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-cache'
+    return response